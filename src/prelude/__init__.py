@@ -1,4 +1,4 @@
-from . import lst, pth, seq, set, dt
+from . import lst, pth, seq, set, sketch, dt
 from .dt import Date, DateTime, Duration, Period
 from .utils import *
 from .model import Model
@@ -2,3 +2,93 @@
 Functions for caching
 the result of functions
 """
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+
+
+class LRU:
+    """
+    A bounded, thread safe, least recently used cache
+    that keeps hit and miss statistics.
+
+    eg:
+    cache = LRU(maxsize=1024)
+    value = cache.get_or_set(key, lambda: expensive(key))
+    cache.stats() == {'hits': 0, 'misses': 1, ...}
+    """
+
+    def __init__(self, maxsize: int = 1024, enabled=True):
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f'LRU(maxsize={self.maxsize:,}, size={len(self):,}, hits={self.hits:,}, misses={self.misses:,})'
+
+    def get_or_set(self, key: Hashable, create: Callable[[], Any]) -> Any:
+        """
+        Return the value cached under the key, otherwise
+        create it with the given function and cache it
+        """
+        if not self.enabled or self.maxsize <= 0:
+            return create()
+
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+                return value
+
+        # Create outside the lock so slow work is not serialised
+        value = create()
+
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+        return value
+
+    def resize(self, maxsize: int):
+        """
+        Change the maximum size, evicting the
+        least recently used items if needed
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._items) > max(maxsize, 0):
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove every item and reset the statistics
+        """
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit and miss statistics of the cache
+        """
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self),
+            maxsize=self.maxsize,
+            hit_rate=self.hits / total if total else 0.0
+        )
@@ -11,9 +11,23 @@ from pendulum.date import Date
 from pendulum.datetime import DateTime
 from pendulum.duration import Duration
 from pendulum.period import Period
-from pendulum.tz.timezone import Timezone
+from pendulum.tz.timezone import FixedTimezone, Timezone
 from pendulum.parsing import parse
-from . import log, lst, seq
+import atexit
+import builtins
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from threading import Lock
+from typing import Callable, Dict, Generator, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+import pytz
+from pandas import DataFrame, Series
+from pandas.api.types import is_datetime64_any_dtype
+from . import cache, log, lst, seq
 
 
 NICE_DATETIME_FORMAT = "D MMM HH:mm"
@@ -23,6 +37,25 @@ NICE_DATE_FORMAT = "MMM DD"
 SHORT_DATE_FORMAT="DD/MM"
 TIMEZONE = 'UTC'
 
+# Parsed string inputs of `datetime`, `date` and
+# `pandas_utils.to_timestamp`, keyed on (kind, string, format, tz).
+# Use `parse_cache.resize` to change its size or set
+# `parse_cache.enabled = False` to disable it.
+parse_cache = cache.LRU(maxsize=65_536)
+
+# Strings that parse to a different instant on each call
+RELATIVE_STRINGS = frozenset(['now', 'today', 'tomorrow', 'yesterday'])
+
+
+def cached_parse(key: Tuple, create: Callable):
+    """
+    The cached result of parsing the string in `key`,
+    relative strings like "now" are never cached
+    """
+    if key[1].strip().lower() in RELATIVE_STRINGS:
+        return create()
+    return parse_cache.get_or_set(key, create)
+
 
 def duration(
         *args,
@@ -82,6 +115,207 @@ def elapsed(arg) -> str:
     return msg
 
 
+def get_timezone(tz) -> Timezone:
+    """
+    The pendulum timezone of the given name, offset in
+    hours or tzinfo, names are resolved once per process
+    """
+    if isinstance(tz, str):
+        return _named_timezone(tz)
+    return pn._safe_timezone(tz)
+
+
+@lru_cache(maxsize=None)
+def _named_timezone(name: str) -> Timezone:
+    return pn.timezone(name)
+
+
+def get_pandas_timezone(tz):
+    """
+    The timezone pandas uses for the given name, offset
+    in hours or tzinfo, names are resolved once per process
+    """
+    if not isinstance(tz, str):
+        tz = get_timezone(tz)
+        if isinstance(tz, FixedTimezone):
+            return pytz.FixedOffset(tz.offset // 60)
+        tz = _tz_name(tz)
+    return _pandas_timezone(tz)
+
+
+@lru_cache(maxsize=None)
+def _pandas_timezone(name: str):
+    return pytz.timezone(name)
+
+
+class Transitions:
+    """
+    The UTC offsets of a timezone as sorted int64 arrays
+    of the instants each offset starts from, for converting
+    epoch nanosecond arrays without boxing each value
+    """
+
+    def __init__(self, utc: np.ndarray, offsets: np.ndarray):
+        self.utc = utc
+        self.offsets = offsets
+
+    @classmethod
+    def make(cls, tz) -> 'Transitions':
+        zone = get_pandas_timezone(tz)
+        times = getattr(zone, '_utc_transition_times', None)
+        if not times:
+            offset = zone.utcoffset(pydatetime(2000, 1, 1))
+            return cls(np.array([np.iinfo(np.int64).min]), np.array([_td_ns(offset)]))
+
+        utc = pd.to_datetime(times[1:]).asi8
+        utc = np.concatenate([[np.iinfo(np.int64).min], utc])
+        offsets = np.array([_td_ns(info[0]) for info in zone._transition_info], dtype=np.int64)
+        return cls(utc, offsets)
+
+    def offset(self, utc_ns: np.ndarray) -> np.ndarray:
+        """
+        The offset in effect at each UTC instant
+        """
+        return self.offsets[np.searchsorted(self.utc, utc_ns, 'right') - 1]
+
+    def to_local(self, utc_ns: np.ndarray) -> np.ndarray:
+        """
+        Epoch nanoseconds to local wall clock nanoseconds
+        """
+        utc_ns = np.asarray(utc_ns, dtype=np.int64)
+        return utc_ns + self.offset(utc_ns)
+
+    def to_utc(self, local_ns: np.ndarray) -> np.ndarray:
+        """
+        Local wall clock nanoseconds to epoch nanoseconds,
+        ambiguous times resolve to one of their instants
+        """
+        local_ns = np.asarray(local_ns, dtype=np.int64)
+        guess = local_ns - self.offset(local_ns)
+        return local_ns - self.offset(guess)
+
+
+def _td_ns(delta: pytimedelta) -> int:
+    return (delta.days * 86_400 + delta.seconds) * 10**9 + delta.microseconds * 1000
+
+
+@lru_cache(maxsize=None)
+def transitions(tz) -> Transitions:
+    """
+    The offset transition table of the given
+    timezone, computed once per process
+    """
+    return Transitions.make(tz)
+
+
+def convert_local(values, source, target) -> np.ndarray:
+    """
+    Convert an array of local wall clock epoch
+    nanoseconds from one timezone to another
+    """
+    return transitions(target).to_local(transitions(source).to_utc(values))
+
+
+LOCALIZED = 'localized'
+CONVERTED = 'converted'
+
+LocalizeEvent = Tuple[str, str, str]
+
+
+class LocalizeWarnings:
+    """
+    Counts the datetimes that `datetime` and `datetimes`
+    localize or convert, keyed on (event, source tz, target tz).
+
+    The first event of each key is logged straight away,
+    later ones are only counted and logged as a summary
+    every `interval` seconds, when `report` is called, at
+    the end of a `batch` block or at exit.
+
+    eg:
+    with dt.localize_warnings.batch():
+        times = [dt.datetime(x) for x in strings]
+    dt.localize_warnings.counts()
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._totals: Counter = Counter()
+        self._pending: Counter = Counter()
+        self._last_report = time.monotonic()
+        self._lock = Lock()
+
+    def record(self, event: str, source: str, target: str, value=None, count: int = 1):
+        """
+        Record that `count` datetimes were localized
+        or converted from `source` to `target`
+        """
+        key = (event, source, target)
+        with self._lock:
+            first = key not in self._totals
+            self._totals[key] += count
+            if not first:
+                self._pending[key] += count
+            due = time.monotonic() - self._last_report >= self.interval
+
+        if first:
+            log.warning(self._describe(key, count, value))
+        if due and self._pending:
+            self.report()
+
+    def report(self):
+        """
+        Log a summary of the events counted since
+        the last report
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = Counter()
+            self._last_report = time.monotonic()
+
+        for key, count in sorted(pending.items()):
+            log.warning(self._describe(key, count))
+
+    def counts(self) -> Dict[LocalizeEvent, int]:
+        """
+        The total number of each event
+        since the counters were reset
+        """
+        with self._lock:
+            return dict(self._totals)
+
+    def reset(self):
+        """
+        Clear the counters without reporting
+        """
+        with self._lock:
+            self._totals.clear()
+            self._pending.clear()
+            self._last_report = time.monotonic()
+
+    @contextmanager
+    def batch(self):
+        """
+        Report the events of the block when it exits
+        """
+        try:
+            yield self
+        finally:
+            self.report()
+
+    @staticmethod
+    def _describe(key: LocalizeEvent, count: int, value=None) -> str:
+        event, source, target = key
+        example = f' eg "{value}"' if value is not None else ''
+        if event == LOCALIZED:
+            return f'{count:,} naive datetimes were localized to "{target}"{example}'
+        return f'{count:,} datetimes were converted from "{source}" to "{target}"{example}'
+
+
+localize_warnings = LocalizeWarnings()
+atexit.register(localize_warnings.report)
+
+
 def now(tz=TIMEZONE) -> DateTime:
     """
     Get the current datetime
@@ -129,31 +363,43 @@ def datetime(
         val = pn.instance(arg)
 
     elif isinstance(arg, pydate):
-        val = pn.datetime(year=arg.year, month=arg.month, day=arg.day, tz=timezone)
+        val = pn.datetime(year=arg.year, month=arg.month, day=arg.day, tz=tz)
 
     elif isinstance(arg, str):
-        if format:
-            val = pn.from_format(arg, format)
-        else:
-            val = pn.parse(arg) #type:ignore
-            val = datetime(val)
+        val, localized = cached_parse(
+            ('datetime', arg, format, tz),
+            lambda: _parse_datetime(arg, format, tz)
+        )
 
     else:
         raise ValueError(f"Could not create a DateTime from {arg} of type {type(arg)}")
 
-    localized = val.in_tz(tz)
-    timezone : Timezone = localized.timezone #type:ignore
-    
-    # A naive datetime has been localized        
-    if not val.tz and warn_on_localize:
-        log.warning(f'naive datetime "{val}" is being localized to "{timezone.name}"')
-    # A localized datetime has been converted
-    elif val.tz and val.tz != timezone and warn_on_localize:
-        log.warning(f'datetime "{val}" was converted from "{val.tz.name}" to "{timezone.name}"')
+    if not isinstance(arg, str):
+        localized = val.in_tz(get_timezone(tz))
+    if warn_on_localize:
+        timezone : Timezone = localized.timezone #type:ignore
+        # A naive datetime has been localized
+        if not val.tz:
+            localize_warnings.record(LOCALIZED, '', timezone.name, val)
+        # A localized datetime has been converted
+        elif val.tz != timezone:
+            localize_warnings.record(CONVERTED, val.tz.name, timezone.name, val)
 
     return localized
 
 
+def _parse_datetime(arg: str, format: str, tz):
+    """
+    Parse the string returning the parsed
+    and the localized datetime
+    """
+    if format:
+        val = pn.from_format(arg, format)
+    else:
+        val = pn.instance(pn.parse(arg)) #type:ignore
+    return val, val.in_tz(get_timezone(tz))
+
+
 def date(*args, year:int=1900, month:int=1, day:int=1, format:str = "") -> Date:
     """
     Create a from the given arguments
@@ -170,41 +416,213 @@ def date(*args, year:int=1900, month:int=1, day:int=1, format:str = "") -> Date:
         return Date(arg.year, arg.month, arg.day)
 
     elif isinstance(arg, str):
-        if format:
-            parsed = pn.from_format(arg, format)
-        else:
-            parsed = parse(arg)
-        return date(parsed)
+        return cached_parse(
+            ('date', arg, format, None),
+            lambda: _parse_date(arg, format)
+        )
     else:
         raise ValueError(f'Could not create a Date from {arg}')
 
 
-def time_period(*args, tz=TIMEZONE, default=None) -> Period:
+def _parse_date(arg: str, format: str) -> Date:
+    if format:
+        parsed = pn.from_format(arg, format)
+    else:
+        parsed = parse(arg)
+    return date(parsed)
+
+
+# Pendulum format tokens, text in brackets and escaped characters
+_FORMAT_TOKENS = re.compile(
+    r"\[([^\[]*)\]|\\(.)|(Mo|MM?M?M?|Do|DDDo|DD?D?D?|ddd?d?|do?|E{1,4}|w[o|w]?|W[o|W]?|Qo?|YYYY|YY|Y"
+    r"|gg(ggg?)?|GG(GGG?)?|a|A|hh?|HH?|kk?|mm?|ss?|S{1,9}|x|X|zz?|ZZ?|LTS|LT|LL?L?L?)"
+)
+
+# The pendulum format tokens that have a strftime equivalent
+_STRFTIME_TOKENS = {
+    'YYYY': '%Y', 'YY': '%y',
+    'MMMM': '%B', 'MMM': '%b', 'MM': '%m', 'M': '%-m',
+    'DDDD': '%j', 'DD': '%d', 'D': '%-d',
+    'dddd': '%A', 'ddd': '%a', 'd': '%w', 'E': '%u',
+    'HH': '%H', 'H': '%-H', 'hh': '%I', 'h': '%-I',
+    'mm': '%M', 'm': '%-M', 'ss': '%S', 's': '%-S',
+    'SSSSSS': '%f', 'A': '%p', 'zz': '%Z', 'ZZ': '%z',
+}
+
+# strptime's %z also reads offsets with a colon
+_STRPTIME_TOKENS = dict(_STRFTIME_TOKENS, Z='%z')
+
+
+@lru_cache(maxsize=None)
+def strftime_format(fmt: str, parse=False) -> str:
+    """
+    Translate a pendulum format string such as
+    NICE_DATETIME_FORMAT into a strftime pattern.
+    If `parse`, the pattern is valid for strptime
+    which has no unpadded directives.
+
+    Raises a ValueError for tokens with no strftime
+    equivalent, such as "Do" or "SSS".
+    """
+    tokens = _STRPTIME_TOKENS if parse else _STRFTIME_TOKENS
+    out = []
+    i = 0
+    for match in _FORMAT_TOKENS.finditer(fmt):
+        out.append(fmt[i:match.start()].replace('%', '%%'))
+        i = match.end()
+
+        token = match.group(3)
+        if token is None:
+            # Text in brackets or an escaped character
+            text = match.group(1) if match.group(1) is not None else match.group(2)
+            out.append(text.replace('%', '%%'))
+        elif token in tokens:
+            directive = tokens[token]
+            out.append(directive.replace('-', '') if parse else directive)
+        else:
+            raise ValueError(f'The format token "{token}" in "{fmt}" has no strftime equivalent')
+
+    out.append(fmt[i:].replace('%', '%%'))
+    return ''.join(out)
+
+
+def _tz_name(tz) -> str:
+    """
+    The name of a pandas or pendulum timezone
+    """
+    name = getattr(tz, 'zone', None) or getattr(tz, 'name', None)
+    if name:
+        return str(name)
+    offset = pydatetime.now(tz).strftime('%z')
+    return f'{offset[:3]}:{offset[3:]}'
+
+
+def _parse_datetimes(values, format='') -> Series:
+    """
+    Parse the values into a datetime64 Series, keeping
+    the timezone of the values if they share one
+    """
+    series = values if isinstance(values, Series) else Series(values)
+    if is_datetime64_any_dtype(series):
+        return series
+
+    try:
+        fmt = strftime_format(format, parse=True) if format else None
+    except ValueError:
+        # Parse each value with pendulum instead
+        series = series.map(lambda v: pn.from_format(v, format).isoformat() if isinstance(v, str) else v)
+        fmt = None
+
+    parsed = pd.to_datetime(series, format=fmt)
+
+    # Mixed offsets can only be held in UTC
+    if not is_datetime64_any_dtype(parsed):
+        parsed = pd.to_datetime(series, format=fmt, utc=True)
+
+    return parsed
+
+
+def _unwrap(parsed: Series, values):
+    """
+    Return a Series for a Series, otherwise an Index
+    """
+    if isinstance(values, Series):
+        return parsed
+    return pd.DatetimeIndex(parsed)
+
+
+def datetimes(values, tz=TIMEZONE, format='', warn_on_localize=True) -> Union[Series, pd.DatetimeIndex]:
+    """
+    Convert the given Series, array or list to
+    timezone aware datetimes in bulk, see `datetime`.
+
+    As with `datetime`, naive values are taken to
+    be UTC and all values are converted to `tz`.
+    A warning is logged once per batch rather than
+    once per value.
+
+    Returns a Series for a Series, otherwise a DatetimeIndex.
+    """
+    parsed = _parse_datetimes(values, format)
+    timezone = get_pandas_timezone(tz)
+    target = _tz_name(timezone)
+
+    if parsed.dt.tz is None:
+        parsed = parsed.dt.tz_localize('UTC')
+
+    source = _tz_name(parsed.dt.tz)
+    if source != target and warn_on_localize:
+        count = int(parsed.notna().sum())
+        if count:
+            localize_warnings.record(CONVERTED, source, target, parsed[parsed.notna()].iloc[0], count=count)
+
+    return _unwrap(parsed.dt.tz_convert(timezone), values)
+
+
+def dates(values, format='') -> Union[Series, pd.DatetimeIndex]:
+    """
+    Convert the given Series, array or list to
+    dates in bulk, see `date`.
+
+    As with `date`, the date is taken in the timezone
+    of each value without any conversion.  Dates are
+    returned as naive datetime64 values at midnight.
+    """
+    parsed = _parse_datetimes(values, format)
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_localize(None)
+    return _unwrap(parsed.dt.normalize(), values)
+
+
+def time_period(*args, field: Union[str, Sequence[str]] = '', tz=TIMEZONE, default=None) -> Period:
     """
     Create a time period from the given
     arguments.  Arguments may be anything that
     `datetime` accepts.  The resulting time period
     will span the given arguments.
+
+    field: Union[str, Sequence[str]]
+        If given, the span is taken over these
+        fields of DataFrames and dicts, eg:
+        time_period(df, field=['start_time', 'end_time'])
+    default:
+        Used if no datetimes are found, otherwise
+        a ValueError is raised
+
+    Arrays, Series and DataFrame columns are reduced
+    with a single native min/max each.
     """
-    max_time = DateTime.min
-    min_time = DateTime.max
-    valid = False
-    
-    for arg in seq.iter(args):
-        time = datetime(arg, tz=tz)
-        min_time = min(min_time, time)
-        max_time = max(max_time, time)
-        valid = True
+    fields = [field] if isinstance(field, str) else list(field)
+    min_time = None
+    max_time = None
+
+    for name in fields:
+        for item in seq.chunks(args, field=name, method='values'):
+            if type(item) is seq.Chunk and item.array().dtype.kind in 'MOU':
+                times = pd.to_datetime(item.array(), utc=True)
+                lo, hi = times.min(), times.max()
+                if lo is pd.NaT:
+                    continue
+                lo, hi = datetime(lo, tz=tz), datetime(hi, tz=tz)
+
+            elif type(item) is seq.Chunk:
+                values = [datetime(value, tz=tz) for value in item.tolist()]
+                if not values:
+                    continue
+                lo, hi = min(values), max(values)
+
+            else:
+                lo = hi = datetime(item, tz=tz)
+
+            if min_time is None or lo < min_time:
+                min_time = lo
+            if max_time is None or hi > max_time:
+                max_time = hi
 
-    if valid:
+    if min_time is None or max_time is None:
         if default is None:
             raise ValueError(f'No arguments or default was given')
-        
-        time = datetime(default)
-        min_time = time
-        max_time = time
-    elif max_time < min_time:
-        min_time, max_time = max_time, min_time
+        min_time = max_time = datetime(default, tz=tz)
 
     return Period(start=min_time, end=max_time)
 
@@ -242,4 +660,598 @@ class HasTimePeriod:
     return str(self.get_time_period().in_words())
   
   def period_in_words(self, fmt=NICE_DATETIME_FORMAT) -> str:
-    return f'{self.start_time.format(fmt)} to {self.end_time.format(fmt)}'
\ No newline at end of file
+    return f'{self.start_time.format(fmt)} to {self.end_time.format(fmt)}'
+
+def epoch_ns(arg) -> int:
+    """
+    Convert anything `datetime` accepts to
+    nanoseconds since the unix epoch
+    """
+    if isinstance(arg, (pd.Timestamp, np.datetime64)):
+        time = pd.Timestamp(arg)
+        if time.tz is None:
+            time = time.tz_localize('UTC')
+        return int(time.value)
+    return int(pd.Timestamp(datetime(arg, warn_on_localize=False)).value)
+
+
+class _Bucket:
+    """
+    Intervals of similar length sorted by start
+    """
+    __slots__ = ('starts', 'ends', 'ids', 'max_length')
+
+    def __init__(self):
+        self.starts = np.empty(0, dtype=np.int64)
+        self.ends = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.max_length = 0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, starts: np.ndarray, ends: np.ndarray, ids: np.ndarray):
+        order = np.argsort(starts, kind='stable')
+        starts, ends, ids = starts[order], ends[order], ids[order]
+        if len(self):
+            # Merge into the existing sorted arrays
+            positions = np.searchsorted(self.starts, starts, 'right')
+            starts = np.insert(self.starts, positions, starts)
+            ends = np.insert(self.ends, positions, ends)
+            ids = np.insert(self.ids, positions, ids)
+        self.starts, self.ends, self.ids = starts, ends, ids
+        self.max_length = max(self.max_length, int((ends - starts).max()))
+
+    def remove(self, start: int, i: int):
+        lo = np.searchsorted(self.starts, start, 'left')
+        hi = np.searchsorted(self.starts, start, 'right')
+        position = lo + np.flatnonzero(self.ids[lo:hi] == i)
+        self.starts = np.delete(self.starts, position)
+        self.ends = np.delete(self.ends, position)
+        self.ids = np.delete(self.ids, position)
+
+    def slice(self, lo: int, hi: int):
+        i = np.searchsorted(self.starts, lo, 'left')
+        j = np.searchsorted(self.starts, hi, 'right')
+        return self.starts[i:j], self.ends[i:j], self.ids[i:j]
+
+
+class TimePeriodIndex:
+    """
+    An index of closed time periods for overlap,
+    containment and stabbing queries.
+
+    Periods are stored as int64 epoch nanoseconds in
+    buckets of similar length, each sorted by start, so
+    a query is a binary search per bucket plus a
+    vectorized filter of the candidates it finds.
+
+    eg:
+    index = TimePeriodIndex.make(shifts)
+    index.overlapping('2023-01-01 08:00', '2023-01-01 12:00')
+    index.at('2023-01-01 09:30')
+
+    index = TimePeriodIndex.from_frame(df, 'start_time', 'end_time')
+    df.loc[index.at(now())]
+    """
+
+    def __init__(self):
+        self._buckets: Dict[int, _Bucket] = {}
+        # Items by id, and the bucket and start of each id
+        self._items: Dict[int, object] = {}
+        self._where: Dict[int, Tuple[int, int]] = {}
+        # Ids by object id for objects, or by label for rows
+        self._keys: Dict[object, int] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __repr__(self) -> str:
+        return f'TimePeriodIndex({len(self):,} periods)'
+
+    def __contains__(self, item) -> bool:
+        return self._key(item) in self._keys
+
+    def _key(self, item):
+        if id(item) in self._keys:
+            return id(item)
+        try:
+            hash(item)
+        except TypeError:
+            return id(item)
+        return item
+
+    @classmethod
+    def make(cls, items) -> 'TimePeriodIndex':
+        """
+        Build an index of the given HasTimePeriod objects
+        """
+        items = list(items)
+        periods = [item.get_time_period() for item in items]
+        starts = pd.to_datetime([period.start for period in periods], utc=True).asi8
+        ends = pd.to_datetime([period.end for period in periods], utc=True).asi8
+        index = cls()
+        index._extend(items, starts, ends, key=id)
+        return index
+
+    @classmethod
+    def from_frame(cls, df, start='start_time', end='end_time') -> 'TimePeriodIndex':
+        """
+        Build an index of the rows of the DataFrame
+        from its start and end columns, queries
+        return the index labels of the rows
+        """
+        starts = pd.to_datetime(df[start], utc=True).values.view(np.int64)
+        ends = pd.to_datetime(df[end], utc=True).values.view(np.int64)
+        index = cls()
+        index._extend(list(df.index), starts, ends, key=lambda label: label)
+        return index
+
+    def _extend(self, items: list, starts: np.ndarray, ends: np.ndarray, key):
+        swap = ends < starts
+        starts, ends = np.where(swap, ends, starts), np.where(swap, starts, ends)
+
+        ids = np.arange(self._next_id, self._next_id + len(items), dtype=np.int64)
+        self._next_id += len(items)
+
+        # Bucket by the bit length of each period's length
+        buckets = np.ceil(np.log2(ends - starts + 1)).astype(np.int64)
+
+        for i, item, b, start in zip(ids.tolist(), items, buckets.tolist(), starts.tolist()):
+            self._items[i] = item
+            self._where[i] = (b, start)
+            self._keys[key(item)] = i
+
+        for b in np.unique(buckets).tolist():
+            mask = buckets == b
+            bucket = self._buckets.setdefault(b, _Bucket())
+            bucket.add(starts[mask], ends[mask], ids[mask])
+
+    def insert(self, item, start=None, end=None):
+        """
+        Add a HasTimePeriod object, or any item
+        with the given start and end
+        """
+        if start is None or end is None:
+            period = item.get_time_period()
+            start, end = period.start, period.end
+            key = id
+        else:
+            key = lambda x: x
+        starts = np.array([epoch_ns(start)], dtype=np.int64)
+        ends = np.array([epoch_ns(end)], dtype=np.int64)
+        self._extend([item], starts, ends, key=key)
+
+    def remove(self, item):
+        """
+        Remove the item, raising a KeyError
+        if it is not in the index
+        """
+        i = self._keys.pop(self._key(item))
+        del self._items[i]
+        b, start = self._where.pop(i)
+        bucket = self._buckets[b]
+        bucket.remove(start, i)
+        if not len(bucket):
+            del self._buckets[b]
+
+    def _query(self, lo, hi, select) -> list:
+        starts, ids = [], []
+        for bucket in self._buckets.values():
+            s, e, i = select(bucket, lo, hi)
+            starts.append(s)
+            ids.append(i)
+
+        if not ids:
+            return []
+
+        starts = np.concatenate(starts)
+        ids = np.concatenate(ids)[np.argsort(starts, kind='stable')]
+        items = self._items
+        return [items[i] for i in ids.tolist()]
+
+    def overlapping(self, start, end=None) -> list:
+        """
+        The items whose period overlaps the
+        given one, ordered by start
+        """
+        lo = epoch_ns(start)
+        hi = lo if end is None else epoch_ns(end)
+
+        def select(bucket, lo, hi):
+            s, e, i = bucket.slice(lo - bucket.max_length, hi)
+            mask = e >= lo
+            return s[mask], e[mask], i[mask]
+
+        return self._query(lo, hi, select)
+
+    def at(self, time) -> list:
+        """
+        The items whose period contains
+        the given instant, ordered by start
+        """
+        return self.overlapping(time)
+
+    def within(self, start, end) -> list:
+        """
+        The items whose period lies within
+        the given one, ordered by start
+        """
+        def select(bucket, lo, hi):
+            s, e, i = bucket.slice(lo, hi)
+            mask = e <= hi
+            return s[mask], e[mask], i[mask]
+
+        return self._query(epoch_ns(start), epoch_ns(end), select)
+
+    def containing(self, start, end) -> list:
+        """
+        The items whose period contains
+        the given one, ordered by start
+        """
+        def select(bucket, lo, hi):
+            s, e, i = bucket.slice(hi - bucket.max_length, lo)
+            mask = e >= hi
+            return s[mask], e[mask], i[mask]
+
+        return self._query(epoch_ns(start), epoch_ns(end), select)
+
+
+def _box_ns(value: int, tz=TIMEZONE) -> DateTime:
+    """
+    Box epoch nanoseconds as a pendulum DateTime
+    """
+    time = pd.Timestamp(value, tz='UTC').to_pydatetime(warn=False)
+    return pn.instance(time).in_tz(get_timezone(tz))
+
+
+class DurationArray:
+    """
+    A column of durations stored as int64 nanoseconds,
+    elements are only boxed to pendulum Durations
+    when accessed one at a time.
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=np.int64)
+
+    @classmethod
+    def make(cls, *args) -> 'DurationArray':
+        """
+        Create from timedelta64 arrays or Series, or
+        anything `duration` accepts
+        """
+        parts = []
+        for item in seq.chunks(args, method='values'):
+            if type(item) is seq.Chunk and item.array().dtype.kind == 'm':
+                parts.append(item.array().astype('timedelta64[ns]').view(np.int64))
+            else:
+                values = item.tolist() if type(item) is seq.Chunk else [item]
+                parts.append(np.array([_duration_ns(value) for value in values], dtype=np.int64))
+        return cls(np.concatenate(parts) if parts else [])
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __repr__(self) -> str:
+        return f'DurationArray({len(self):,} durations)'
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return pn.duration(microseconds=int(self.values[index]) // 1000)
+        return DurationArray(self.values[index])
+
+    def __iter__(self):
+        for i in builtins.range(len(self)):
+            yield self[i]
+
+    def __add__(self, other) -> 'DurationArray':
+        return DurationArray(self.values + _duration_values(other))
+
+    def __sub__(self, other) -> 'DurationArray':
+        return DurationArray(self.values - _duration_values(other))
+
+    def __eq__(self, other):
+        return self.values == _duration_values(other)
+
+    def __lt__(self, other):
+        return self.values < _duration_values(other)
+
+    def __gt__(self, other):
+        return self.values > _duration_values(other)
+
+    def total_seconds(self) -> np.ndarray:
+        return self.values / 1e9
+
+    def sum(self) -> Duration:
+        return pn.duration(microseconds=int(self.values.sum()) // 1000)
+
+    def to_series(self) -> Series:
+        return Series(self.values.view('timedelta64[ns]'))
+
+
+def _duration_ns(arg) -> int:
+    """
+    Nanoseconds of anything `duration` accepts
+    """
+    if isinstance(arg, (pd.Timedelta, np.timedelta64)):
+        return int(pd.Timedelta(arg).value)
+    return int(round(duration(arg).total_seconds() * 1e6)) * 1000
+
+
+def _duration_values(arg):
+    if isinstance(arg, DurationArray):
+        return arg.values
+    return _duration_ns(arg)
+
+
+class PeriodArray:
+    """
+    A column of time periods stored as int64 epoch
+    nanosecond start and end arrays in a fixed timezone,
+    elements are only boxed to pendulum Periods when
+    accessed one at a time.
+    """
+
+    def __init__(self, starts, ends, tz=TIMEZONE):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.tz = tz
+        if self.starts.shape != self.ends.shape:
+            raise ValueError(f'PeriodArray starts {self.starts.shape} and ends {self.ends.shape} differ in shape')
+
+    @classmethod
+    def make(cls, items, tz=TIMEZONE) -> 'PeriodArray':
+        """
+        Create from Periods or HasTimePeriod objects
+        """
+        periods = [item if isinstance(item, Period) else item.get_time_period() for item in items]
+        starts = pd.to_datetime([period.start for period in periods], utc=True).asi8
+        ends = pd.to_datetime([period.end for period in periods], utc=True).asi8
+        return cls(starts, ends, tz=tz)
+
+    @classmethod
+    def from_frame(cls, df, start='start_time', end='end_time', tz=TIMEZONE) -> 'PeriodArray':
+        """
+        Create from the start and end columns of a DataFrame
+        """
+        starts = pd.to_datetime(df[start], utc=True).values.view(np.int64)
+        ends = pd.to_datetime(df[end], utc=True).values.view(np.int64)
+        return cls(starts, ends, tz=tz)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __repr__(self) -> str:
+        return f'PeriodArray({len(self):,} periods, tz="{self.tz}")'
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            start = _box_ns(int(self.starts[index]), self.tz)
+            end = _box_ns(int(self.ends[index]), self.tz)
+            return Period(start=start, end=end)
+        return PeriodArray(self.starts[index], self.ends[index], tz=self.tz)
+
+    def __iter__(self):
+        for i in builtins.range(len(self)):
+            yield self[i]
+
+    def length(self) -> DurationArray:
+        """
+        The length of each period
+        """
+        return DurationArray(self.ends - self.starts)
+
+    def overlaps(self, start, end=None) -> np.ndarray:
+        """
+        Whether each period overlaps the given period,
+        or elementwise with another PeriodArray
+        """
+        if isinstance(start, PeriodArray):
+            return (self.starts <= start.ends) & (self.ends >= start.starts)
+        lo = epoch_ns(start)
+        hi = lo if end is None else epoch_ns(end)
+        return (self.starts <= hi) & (self.ends >= lo)
+
+    def shift(self, by) -> 'PeriodArray':
+        """
+        Move every period by the given duration
+        or elementwise by a DurationArray
+        """
+        delta = _duration_values(by)
+        return PeriodArray(self.starts + delta, self.ends + delta, tz=self.tz)
+
+    def clip(self, start, end) -> 'PeriodArray':
+        """
+        Clip every period to the given period, periods
+        outside it become empty at the nearest bound
+        """
+        lo, hi = epoch_ns(start), epoch_ns(end)
+        starts = np.clip(self.starts, lo, hi)
+        ends = np.clip(self.ends, lo, hi)
+        return PeriodArray(starts, np.maximum(starts, ends), tz=self.tz)
+
+    def merge_adjacent(self, gap=None) -> 'PeriodArray':
+        """
+        Merge overlapping periods, and those separated
+        by no more than `gap`, returning them sorted
+        """
+        if not len(self):
+            return PeriodArray([], [], tz=self.tz)
+
+        tolerance = 0 if gap is None else _duration_ns(gap)
+        order = np.argsort(self.starts, kind='stable')
+        starts, ends = self.starts[order], self.ends[order]
+
+        # A new group starts after a gap from every earlier period
+        reach = np.maximum.accumulate(ends)
+        breaks = np.flatnonzero(starts[1:] > reach[:-1] + tolerance) + 1
+        groups = np.r_[0, breaks]
+
+        return PeriodArray(starts[groups], np.maximum.reduceat(ends, groups), tz=self.tz)
+
+    def to_frame(self, start='start_time', end='end_time') -> DataFrame:
+        """
+        Convert to a DataFrame of timezone aware columns
+        """
+        return DataFrame({
+            start: pd.to_datetime(self.starts, utc=True).tz_convert(get_pandas_timezone(self.tz)),
+            end: pd.to_datetime(self.ends, utc=True).tz_convert(get_pandas_timezone(self.tz))
+        })
+
+
+# Units of `durations_in_words`, largest first
+_WORD_UNITS = [
+    (7 * 86_400 * 10**9, 'week', 'w'),
+    (86_400 * 10**9, 'day', 'd'),
+    (3_600 * 10**9, 'hour', 'h'),
+    (60 * 10**9, 'minute', 'm'),
+    (10**9, 'second', 's'),
+]
+
+
+def _nanoseconds(values) -> Tuple[np.ndarray, object]:
+    """
+    Durations as int64 nanoseconds and the
+    index of the values if they were a Series
+    """
+    index = values.index if isinstance(values, Series) else None
+    if isinstance(values, PeriodArray):
+        values = values.length()
+    if not isinstance(values, DurationArray):
+        values = DurationArray.make(values)
+    return values.values, index
+
+
+def durations_in_words(values, short=False) -> Series:
+    """
+    Format a Series, array or DurationArray of durations
+    as words in bulk, eg "1 minute 10 seconds" as
+    `Duration.in_words` would, or "1m 10s" if `short`
+    """
+    ns, index = _nanoseconds(values)
+    sign = np.where(ns < 0, '-', '')
+    remaining = np.abs(ns)
+
+    words = Series([''] * len(ns), dtype=object)
+    for size, name, abbreviation in _WORD_UNITS:
+        count = remaining // size
+        remaining = remaining % size
+
+        counts = Series(count.astype(str), dtype=object)
+        if short:
+            part = sign + counts + abbreviation
+        else:
+            plural = Series(np.where(count == 1, '', 's'), dtype=object)
+            part = sign + counts + f' {name}' + plural
+
+        part = part.where(count > 0, '')
+        words = (words + ' ' + part).where((words != '') & (part != ''), words + part)
+
+    # Durations of less than a second
+    if short:
+        empty = '0s'
+    else:
+        fractions = np.char.mod('%.2f second', np.abs(ns) / 1e9)
+        empty = Series(np.where(ns == 0, '0 microseconds', fractions), dtype=object)
+    words = words.where(words != '', empty)
+
+    if index is not None:
+        words.index = index
+    return words
+
+
+def format_datetimes(values, fmt=NICE_DATETIME_FORMAT, tz=TIMEZONE) -> Series:
+    """
+    Format a Series or array of datetimes in bulk with
+    a pendulum format, converted to the given timezone.
+    Formats without a strftime equivalent are applied
+    to each value with pendulum.
+    """
+    index = values.index if isinstance(values, Series) else None
+    times = Series(pd.to_datetime(values, utc=True)).dt.tz_convert(get_pandas_timezone(tz))
+    try:
+        strings = times.dt.strftime(strftime_format(fmt))
+    except ValueError:
+        # Format each value with pendulum instead
+        strings = times.map(lambda t: None if pd.isna(t) else pn.instance(t.to_pydatetime()).format(fmt))
+    if index is not None:
+        strings.index = index
+    return strings
+
+
+def periods_in_words(periods, fmt=NICE_DATETIME_FORMAT) -> Series:
+    """
+    Format a PeriodArray as "<start> to <end>" in
+    bulk, as `HasTimePeriod.period_in_words` would
+    """
+    frame = periods.to_frame()
+    starts = format_datetimes(frame['start_time'], fmt, tz=periods.tz)
+    ends = format_datetimes(frame['end_time'], fmt, tz=periods.tz)
+    return starts + ' to ' + ends
+
+
+def range(start, end, step=None, tz=TIMEZONE, as_array=False):
+    """
+    The datetimes from `start` to `end` inclusive, every
+    `step` which defaults to a day.  Arguments may be
+    anything `datetime` and `duration` accept, if both
+    `start` and `end` are dates then dates are returned.
+
+    Years, months, weeks and days of the step are calendar
+    units, so the wall clock time is kept across changes
+    of offset in `tz`, the rest of the step is exact.
+
+    Datetimes are generated lazily one at a time unless
+    `as_array`, in which case a DatetimeIndex is returned.
+
+    eg:
+        list(range('2020-01-01', '2020-01-03'))
+        range(start, end, duration(minutes=15), as_array=True)
+    """
+    step = duration(days=1) if step is None else duration(step)
+    dates = all(isinstance(x, pydate) and not isinstance(x, pydatetime) for x in (start, end))
+    first = datetime(start, tz=tz, warn_on_localize=False)
+    last = datetime(end, tz=tz, warn_on_localize=False)
+
+    # Calendar units are stepped separately from the exact remainder
+    years, months = step.years, step.months
+    days = step.days - years * 365 - months * 30
+    exact = pytimedelta(seconds=step.total_seconds()) - pytimedelta(days=step.days)
+    if not (years or months or days or exact):
+        raise ValueError('range step must not be zero')
+
+    if as_array:
+        if dates and not (years or months or exact):
+            return pd.date_range(first.date(), last.date(), freq=f'{days}D')
+        elif not (years or months or days):
+            times = pd.date_range(
+                pd.Timestamp(epoch_ns(first), tz='UTC'),
+                pd.Timestamp(epoch_ns(last), tz='UTC'),
+                freq=pd.Timedelta(exact)
+            ).tz_convert(get_pandas_timezone(tz))
+        else:
+            times = pd.to_datetime(list(_range(first, last, years, months, days, exact)), utc=True).tz_convert(get_pandas_timezone(tz))
+        return times.normalize().tz_localize(None) if dates else times
+
+    times = _range(first, last, years, months, days, exact)
+    if dates:
+        return (time.date() for time in times)
+    return times
+
+
+def _range(first: DateTime, last: DateTime, years: int, months: int, days: int, exact: pytimedelta) -> Generator:
+    # Each value is computed from the start so calendar steps don't drift
+    forward = first.add(years=years, months=months, days=days) + exact >= first
+    i = 0
+    while True:
+        time = first.add(years=years * i, months=months * i, days=days * i) + exact * i
+        if (forward and time > last) or (not forward and time < last):
+            return
+        yield time
+        i += 1
+
+
+# `range` is left out so star imports don't shadow the builtin
+__all__ = [name for name in globals() if not name.startswith('_') and name != 'range']
@@ -2,12 +2,13 @@
 List utilities
 """
 from typing import List, TypeVar
+import numpy as np
 from . import seq, set
 
 T = TypeVar("T")
 
 
-def make(*args, field='', method='values') -> List:
+def make(*args, field='', method='values', max_depth=None) -> List:
     """
     Convert the given argument to list.
 
@@ -15,6 +16,8 @@ def make(*args, field='', method='values') -> List:
     The items of the list
     field: str
     If given, dataframes will have this field extracted
+    max_depth: Optional[int]
+    If given, containers nested deeper are not flattened
 
     eg:
     to_list(1, 2, 3, [4,5,6]) == [1,2,3,4,5,6]
@@ -24,13 +27,35 @@ def make(*args, field='', method='values') -> List:
     to_list([1,2],None, allow_none=True) == [1, 2, None]
     """
     items = []
-    for item in seq.iter(*args, field=field, method=method):
-        items.append(item)
+    for item in seq.chunks(*args, field=field, method=method, max_depth=max_depth):
+        if type(item) is seq.Chunk:
+            items.extend(item.tolist())
+        else:
+            items.append(item)
     return items
 
 
+def make_array(*args, field='', method='values', dtype=None) -> np.ndarray:
+    """
+    Convert the given arguments to a single ndarray,
+    see `seq.to_array`
+
+    eg:
+    make_array(df1, df2, field='id') == np.array([...])
+    """
+    return seq.to_array(*args, field=field, method=method, dtype=dtype)
+
+
+def distinct_array(*args, field='', method='values', sort=False, dtype=None) -> np.ndarray:
+    """
+    Convert the given arguments to an ndarray
+    of distinct values, see `seq.to_array`
+    """
+    return seq.to_array(*args, field=field, method=method, distinct=True, sort=sort, dtype=dtype)
+
+
 def distinct(*args, **kwargs):
-    return list(set.make(*args, **kwargs))
+    return list(seq.distinct(*args, **kwargs))
 
 def unique(*args, **kwargs):
     return distinct(*args, **kwargs)    
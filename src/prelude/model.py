@@ -1,14 +1,23 @@
+import copy as _copy
+import enum
 import json
+import hashlib
+import datetime as _datetime
+import threading
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 
 import attrs
 import cattrs
+import numpy as np
 import pandas as pd
 from attrs import define, field
 from pandas import DataFrame, Series
-from typing import Dict, List, Optional, Tuple, Type, TypeVar, Union
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple, Type, TypeVar, Union
 from .pth import Path
 from .dt import *
-from . import pth, dt
+from . import pth, dt, storage
 
 
 def create_cattrs_converter():
@@ -17,7 +26,10 @@ def create_cattrs_converter():
         return dt.timestamp()
 
     def structure_datetime(timestamp, _):
-        return pn.from_timestamp(timestamp)
+        # Build the DateTime from the stdlib conversion, which
+        # is much cheaper than `pn.from_timestamp`
+        d = _datetime.datetime.fromtimestamp(timestamp, _datetime.timezone.utc)
+        return DateTime(d.year, d.month, d.day, d.hour, d.minute, d.second, d.microsecond, tzinfo=pn.UTC)
 
     converter = cattrs.Converter()
     converter.register_unstructure_hook(DateTime, unstructure_datetime)
@@ -26,6 +38,165 @@ def create_cattrs_converter():
 
 converter = create_cattrs_converter()
 
+# Fields of each Model subclass by type
+_fields_of_type: Dict[Tuple[type, Any], Tuple[attrs.Attribute, ...]] = {}
+
+
+def unstructure_fn(cls: type, conv: cattrs.Converter = converter) -> Callable[[Any], Dict]:
+    """
+    The function the converter unstructures the given class
+    with, looked up in the converter's dispatch cache so that
+    hooks registered on the converter, even after first use,
+    take precedence over the generated function
+    """
+    return conv._unstructure_func.dispatch(cls)
+
+
+def structure_fn(cls: type, conv: cattrs.Converter = converter) -> Callable[[Any, Any], Any]:
+    """
+    The function the converter structures the given class
+    with, honouring any hooks registered on the converter
+    """
+    return conv._structure_func.dispatch(cls)
+
+
+class Deferred:
+    """
+    A DataFrame field of a lazily loaded model,
+    read from its file the first time it is needed
+    """
+
+    def __init__(self, cls: type, name: str, folder: Path, mmap=False):
+        self.cls = cls
+        self.name = name
+        self.folder = folder
+        self.mmap = mmap
+        self._lock = threading.Lock()
+        self._value: Optional[DataFrame] = None
+
+    def __repr__(self) -> str:
+        return f'Deferred("{self.folder / self.name}")'
+
+    def load(self) -> DataFrame:
+        with self._lock:
+            if self._value is None:
+                self._value = self.cls._load_frame(self.folder, self.name, mmap=self.mmap)
+            return self._value
+
+
+def _read_frame(folder: Path, name: str, mmap=False) -> Tuple[DataFrame, Path]:
+    """
+    Read the DataFrame field `name` saved in the given
+    folder, empty if there isn't one or it can't be read
+    """
+    df_path = folder / f'{name}.csv'
+    df = DataFrame()
+    found = storage.find(folder, name)
+    if found:
+        df_storage, df_path = found
+        try:
+            df = df_storage.load(df_path, mmap=mmap)
+        except:
+            pass
+    return df, df_path
+
+
+def _save_frame(df_storage: storage.Storage, df: DataFrame, df_path: Path, previous: Optional[Dict]) -> Tuple[Dict, bool]:
+    """
+    Atomically write the DataFrame field unless its entry
+    in the manifest of the last save shows it is unchanged,
+    returning its new entry and whether it was written
+    """
+    entry = dict(format=df_storage.name, hash=storage.fingerprint(df))
+    if entry['hash'] is not None and entry == previous and df_path.exists():
+        return entry, False
+
+    df_storage.save_atomic(df, df_path)
+    return entry, True
+
+
+def _timed(fn: Callable, *args, **kwargs) -> Tuple[Any, float]:
+    t = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - t
+
+
+def run_tasks(tasks: Dict[str, Tuple], workers=1, processes=False) -> Dict[str, Tuple[Any, float]]:
+    """
+    Run each task, a tuple of a function and its arguments,
+    returning the result and seconds taken by name.
+
+    With more than one task and worker they run on a pool
+    of threads, or processes if `processes` is true in
+    which case the functions and arguments must pickle.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        return {name: _timed(*task) for name, task in tasks.items()}
+
+    pool: Executor
+    workers = min(workers, len(tasks))
+    pool = ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers)
+    with pool:
+        futures = {name: pool.submit(_timed, *task) for name, task in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+# Deferred fields of lazily loaded models by instance id
+_deferred: Dict[int, Dict[str, Deferred]] = {}
+
+
+def _pending(model) -> Dict[str, Deferred]:
+    """
+    The deferred fields of the model that are still unset,
+    dropping any that have been assigned since it was loaded
+    """
+    pending = _deferred.get(id(model))
+    if not pending:
+        return {}
+
+    for name in list(pending):
+        try:
+            # Doesn't fall back to `__getattr__` for unset slots
+            object.__getattribute__(model, name)
+        except AttributeError:
+            continue
+        pending.pop(name, None)
+
+    if not pending:
+        _deferred.pop(id(model), None)
+    return pending
+
+# Values that are shared rather than copied by `Model.copy`
+_IMMUTABLE_TYPES = frozenset([str, int, float, complex, bool, bytes, type(None), frozenset, range])
+_IMMUTABLE_BASES = (str, int, float, bytes, frozenset, enum.Enum, _datetime.date, _datetime.time, _datetime.timedelta)
+
+
+def _copy_value(value, deep_frames: bool):
+    """
+    Deep copy a field value, sharing immutable values
+    and copying DataFrames with `deep_frames`
+    """
+    t = type(value)
+    if t in _IMMUTABLE_TYPES:
+        return value
+    if t is list:
+        return [_copy_value(v, deep_frames) for v in value]
+    if t is dict:
+        return {k: _copy_value(v, deep_frames) for k, v in value.items()}
+    if isinstance(value, Model):
+        return value._copy(True, deep_frames)
+    if isinstance(value, (DataFrame, Series)):
+        return value.copy(deep=deep_frames)
+    if isinstance(value, _IMMUTABLE_BASES):
+        return value
+    if t is tuple:
+        return tuple(_copy_value(v, deep_frames) for v in value)
+    if t is set:
+        return {_copy_value(v, deep_frames) for v in value}
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return _copy.deepcopy(value)
+
 
 def int_field(**kwargs):
     return field(default=0, converter=int, **kwargs)
@@ -56,20 +227,27 @@ class Model:
     """
     A base model to inherit from
     """
-    
+
+    # Storage format of DataFrame fields, see `storage`
+    storage_format: ClassVar[str] = 'csv'
+
+    # Workers that save and load DataFrame fields, see `run_tasks`
+    io_workers: ClassVar[int] = 4
+    io_processes: ClassVar[bool] = False
+
     def to_dict(self) -> Dict:
         """
         Convert instance to a dictionary, no
         type conversion will occur
         """
-        return cattrs.unstructure(self)
+        return unstructure_fn(type(self), cattrs.global_converter)(self)
 
     def to_json_dict(self) -> Dict:
         """
         Convert this instance to a JSON compatible
         dictionary
         """
-        return converter.unstructure(self)
+        return unstructure_fn(type(self))(self)
 
     def to_json_string(self) -> str:
         """
@@ -89,10 +267,7 @@ class Model:
         if path.exists() and not overwrite:
             raise Exception(f'File already exists at "{path}" - use `overwrite=True` to overwrite')
 
-        with path.open('w') as file:
-            json.dump(record, file)
-
-        return path
+        return pth.write_text(path, json.dumps(record))
 
     @classmethod
     def from_dict(cls: Type[M], record) -> M:
@@ -100,7 +275,7 @@ class Model:
         Create an instance of this class from
         the given dictionary
         """
-        instance = cattrs.structure(record, cls)
+        instance = structure_fn(cls, cattrs.global_converter)(record, cls)
         return instance
 
     @classmethod
@@ -109,8 +284,8 @@ class Model:
         Create an instance of this class from
         the the given JSON compatible dict
         """
-        instance = converter.structure(record, cls)
-        return instance        
+        instance = structure_fn(cls)(record, cls)
+        return instance
 
     @classmethod
     def from_json_string(cls: Type[M], string) -> M:
@@ -134,16 +309,38 @@ class Model:
         model = cls.from_json_dict(record)
         return model
 
-    def save(self, path: Union[str, Path], overwrite=True) -> Path:
+    def save(
+        self,
+        path: Union[str, Path],
+        overwrite=True,
+        format: Optional[str] = None,
+        workers: Optional[int] = None,
+        processes: Optional[bool] = None,
+        incremental=True
+    ) -> Path:
         """
-        Save this class to the given file
+        Save this class to the given file, DataFrame
+        fields are written in the given storage format,
+        by default the class's `storage_format`.
+
+        DataFrame fields are written concurrently by up to
+        `workers` threads, or processes if `processes` is
+        true, by default the class's `io_workers` and
+        `io_processes`.
+
+        Files are written atomically, and if `incremental`
+        is true the DataFrames and record whose fingerprints
+        match the manifest of the last save are not rewritten
         """
         
         t = pn.now()
         path = Path(path)
+        df_storage = storage.get(format or self.storage_format)
+        workers = self.io_workers if workers is None else workers
+        processes = self.io_processes if processes is None else processes
                         
         # Convert this instance into a dictionary
-        record = converter.unstructure(self)
+        record = self.to_json_dict()
                         
         # Look for DataFrame fields of the class
         df_fields = self._get_fields_of_type(DataFrame)
@@ -152,33 +349,72 @@ class Model:
         else:
             
             path.mkdir(parents=True, exist_ok=overwrite)
+            manifest_path = path / storage.MANIFEST
+            previous = self._read_manifest(manifest_path) if incremental else {}
+            manifest: Dict[str, Any] = dict(version=storage.MANIFEST_VERSION, fields={})
 
+            # Remove the dataframes from the record structure
+            frames: Dict[str, DataFrame] = {}
             for field in df_fields:
-                name = field.name
-
-                # Write the dataframe out to the folder
-                df : DataFrame = record[name]
-                df_path = path / f'{name}.csv'
-                df.to_csv(df_path, index=False)
-                
-                # Remove it from the record structure
-                record.pop(name)
-                self._log(f'{name} saved to {df_path} ({df.shape[0]:,} rows, {df.shape[1]:,} cols)')
+                frames[field.name] = record.pop(field.name)
+
+            # Write the changed dataframes out to the folder
+            tasks = {}
+            for name, df in frames.items():
+                entry = previous.get('fields', {}).get(name)
+                tasks[name] = (_save_frame, df_storage, df, df_storage.path(path, name), entry)
+            results = run_tasks(tasks, workers=workers, processes=processes)
+
+            for name, df in frames.items():
+                (entry, saved), seconds = results[name]
+                manifest['fields'][name] = entry
+                df_path = df_storage.path(path, name)
+                if not saved:
+                    self._log(f'{name} unchanged at {df_path}')
+                    continue
+
+                # Remove any copy saved in another format
+                for other in storage.storages.values():
+                    if other is not df_storage:
+                        other.remove(other.path(path, name))
+
+                self._log(f'{name} saved to {df_path} ({df.shape[0]:,} rows, {df.shape[1]:,} cols) in {seconds:.3f}s')
 
             # Write the partial model to json
             record_path = path / 'model.json'
-            with record_path.open('w') as file:
-                json.dump(record, file)
+            record_string = json.dumps(record)
+            manifest['record'] = hashlib.blake2b(record_string.encode(), digest_size=16).hexdigest()
+            if manifest['record'] == previous.get('record') and record_path.exists():
+                self._log(f'record unchanged at {record_path}')
+            else:
+                pth.write_text(record_path, record_string)
                 self._log(f'record saved to {record_path}')
 
+            # The manifest is written last so that it only
+            # describes files that have been fully written
+            pth.write_text(manifest_path, json.dumps(manifest))
+
         elapsed = (pn.now() - t).in_words() #type:ignore
         self._log(f'model saved to {path} in {elapsed}')
         return path
 
     @classmethod
-    def load(cls : Type[M], path : Union[Path,str]) -> M:
+    def load(
+        cls : Type[M],
+        path : Union[Path,str],
+        mmap=False,
+        lazy=False,
+        workers: Optional[int] = None,
+        processes: Optional[bool] = None
+    ) -> M:
         """
-        Load a Model instance from the given path
+        Load a Model instance from the given path, numeric
+        columns of DataFrame fields saved in the 'npy'
+        format are memory-mapped if `mmap` is true.
+
+        If `lazy` is true DataFrame fields are only read
+        when first accessed, see `materialize`, otherwise
+        they are read concurrently as in `save`
         """
                 
         path = pth.make(path, check_exists=True)
@@ -196,36 +432,119 @@ class Model:
         with record_path.open('r') as file:
             record = json.load(file)
 
-        model = converter.structure(record, cls)
+        model = cls.from_json_dict(record)
         cls._log(f'record loaded from {record_path}')
                 
         # Load the each dataframe field
-        for field in cls._get_fields_of_type(DataFrame):
-            name = field.name
-            df_path = path / f'{name}.csv'
-            df = DataFrame()
-            if df_path.exists():
-                try:
-                    df = pd.read_csv(df_path)
-                except:
-                    pass
-            
-            cls._log(f'{name} loaded from {df_path} ({df.shape[0]:,} rows x {df.shape[1]:,} cols)')
+        df_fields = cls._get_fields_of_type(DataFrame)
+        if lazy and df_fields:
+            # Unset fields are read by `__getattr__` on first access
+            pending = {}
+            for field in df_fields:
+                pending[field.name] = Deferred(cls, field.name, path, mmap=mmap)
+                object.__delattr__(model, field.name)
+            _deferred[id(model)] = pending
+            weakref.finalize(model, _deferred.pop, id(model), None)
+            cls._log(f'{", ".join(pending)} deferred')
+        else:
+            workers = cls.io_workers if workers is None else workers
+            processes = cls.io_processes if processes is None else processes
+            tasks = {field.name: (_read_frame, path, field.name, mmap) for field in df_fields}
+            results = run_tasks(tasks, workers=workers, processes=processes)
+
+            for name, ((df, df_path), seconds) in results.items():
+                cls._log(f'{name} loaded from {df_path} ({df.shape[0]:,} rows x {df.shape[1]:,} cols) in {seconds:.3f}s')
 
-            # Store it on the model
-            setattr(model, name, df)
+                # Store it on the model
+                setattr(model, name, df)
 
         elapsed = (pn.now() - t).in_words() #type:ignore
         cls._log(f'model loaded from {path} in {elapsed}')
         return model
 
-    def copy(self : M) -> M:
+    @classmethod
+    def _read_manifest(cls, path: Path) -> Dict:
         """
-        Return a deep copy of this model by
-        saving and loading from json
+        The manifest written by the last `save`,
+        empty if there isn't a readable one
         """
-        json_string = self.to_json_string()
-        model = self.from_json_string(json_string)
+        try:
+            with path.open('r') as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(manifest, dict) or manifest.get('version') != storage.MANIFEST_VERSION:
+            return {}
+        return manifest
+
+    @classmethod
+    def _load_frame(cls, folder: Path, name: str, mmap=False) -> DataFrame:
+        """
+        Read and log the DataFrame field `name`
+        """
+        (df, df_path), seconds = _timed(_read_frame, folder, name, mmap=mmap)
+        cls._log(f'{name} loaded from {df_path} ({df.shape[0]:,} rows x {df.shape[1]:,} cols) in {seconds:.3f}s')
+        return df
+
+    def __getattr__(self, name: str):
+        # Only reached for unset attributes, which includes
+        # the deferred fields of a lazily loaded model
+        pending = _deferred.get(id(self))
+        if pending and name in pending:
+            value = pending[name].load()
+            object.__setattr__(self, name, value)
+            pending.pop(name, None)
+            if not pending:
+                _deferred.pop(id(self), None)
+            return value
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def materialize(self: M) -> M:
+        """
+        Read any DataFrame fields that were deferred
+        by `load(lazy=True)`, returning this model
+        """
+        for name in list(_pending(self)):
+            getattr(self, name)
+        return self
+
+    def copy(self : M, deep=True) -> M:
+        """
+        Return a copy of this model. A deep copy recurses
+        into nested models and collections and deep copies
+        DataFrames, unless pandas copy-on-write is enabled
+        in which case they are safely shared until modified.
+        A shallow copy shares every field value, other than
+        DataFrames which are copied with `deep=False`.
+        Immutable values are always shared.
+        """
+        deep_frames = deep and not pd.get_option('mode.copy_on_write')
+        return self._copy(deep, deep_frames)
+
+    def _copy(self : M, deep: bool, deep_frames: bool) -> M:
+        cls = type(self)
+        model = cls.__new__(cls)
+        pending = _pending(self)
+
+        for field in attrs.fields(cls):
+            name = field.name
+
+            # Deferred fields stay deferred, with their own handles
+            if name in pending:
+                continue
+
+            value = getattr(self, name)
+            if deep:
+                value = _copy_value(value, deep_frames)
+            elif isinstance(value, (DataFrame, Series)):
+                value = value.copy(deep=False)
+            object.__setattr__(model, name, value)
+
+        if pending:
+            handles = {name: Deferred(d.cls, d.name, d.folder, mmap=d.mmap) for name, d in pending.items()}
+            _deferred[id(model)] = handles
+            weakref.finalize(model, _deferred.pop, id(model), None)
+
         return model
 
     @classmethod
@@ -233,10 +552,10 @@ class Model:
         print(f'{cls.__name__}:', *args, **kwargs)
 
     @classmethod
-    def _get_fields_of_type(cls, type):
-        fields = []
-        for field in attrs.fields(cls):
-            if field.type != type:
-                continue
-            fields.append(field)
+    def _get_fields_of_type(cls, type) -> Tuple[attrs.Attribute, ...]:
+        key = (cls, type)
+        fields = _fields_of_type.get(key)
+        if fields is None:
+            fields = tuple(field for field in attrs.fields(cls) if field.type == type)
+            _fields_of_type[key] = fields
         return fields
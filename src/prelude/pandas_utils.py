@@ -20,10 +20,10 @@ def to_timestamp(arg, tz='UTC') -> pd.Timestamp:
   if isinstance(arg, pd.Timestamp):
     return arg
   elif isinstance(arg, str):
-    return pd.Timestamp(arg)
+    return dt.cached_parse(('timestamp', arg, '', None), lambda: pd.Timestamp(arg))
   else:
     time = dt.datetime(arg)
-    return pd.Timestamp(time).tz_convert(tz)
+    return pd.Timestamp(time).tz_convert(dt.get_pandas_timezone(tz))
 
 
 def empty(arg) -> bool:
@@ -2,6 +2,7 @@
 File/Directory helpers
 """
 
+import os
 from typing import Union
 from pathlib import Path
 
@@ -76,4 +77,19 @@ def exists(arg: PathLike) -> bool:
     """
     Does the given path exist?
     """
-    return make(arg).exists()    
\ No newline at end of file
+    return make(arg).exists()    
+
+def write_text(arg: PathLike, text: str) -> FilePath:
+    """
+    Atomically write the given text to the file, it is
+    written to a temporary file alongside and renamed
+    over the target so readers never see a partial file
+    """
+    path = make(arg, check_exists=False)
+    tmp = path.with_name(f'{path.name}.tmp')
+    with tmp.open('w') as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, path)
+    return path
@@ -1,6 +1,20 @@
-from typing import TypeVar, Sequence, Tuple, Generator, Union, Literal
-from pandas import DataFrame, Series
+import builtins
+import heapq
+import json
+import pickle
+import sys
+import tempfile
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from types import GeneratorType
+from typing import Any, Callable, Dict, Optional, TypeVar, Sequence, Tuple, Generator, Union, Literal
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series, Index
+from pandas.api.extensions import ExtensionArray
 from .log import get_logger
+from . import storage
 
 log = get_logger(__name__)
 
@@ -9,9 +23,306 @@ T = TypeVar("T")
 
 
 Method = Union[Literal['keys'], Literal['values']]
-    
 
-def iter(*args, field='', method: Method = 'keys') -> Generator:
+# Array dtype kinds whose elements can never be nested
+FLAT_KINDS = frozenset('biufcmMU')
+
+# Scalar types that pandas boxes into an array without
+# converting them, as long as they are not mixed
+BOXABLE_TYPES = (bool, int, float, complex, str, bytes, np.generic)
+
+
+class Chunk:
+    """
+    A flat block of values emitted in bulk
+    rather than one element at a time
+    """
+    __slots__ = ('values', 'items')
+
+    def __init__(self, values, items: Optional[list] = None):
+        self.values = values
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def tolist(self) -> list:
+        """
+        The values as a list of the same scalars
+        that iterating the array would give
+        """
+        if self.items is not None:
+            return self.items
+        values = self.values
+        # ndarray.tolist turns datetime64[ns] into ints
+        if isinstance(values, np.ndarray) and values.dtype.kind in 'mM':
+            return list(values)
+        return values.tolist()
+
+    def array(self) -> np.ndarray:
+        """
+        The values as a one dimensional ndarray
+        """
+        return np.asarray(self.values)
+
+
+def bulk(values) -> Optional[Chunk]:
+    """
+    Return the given ndarray, Index or ExtensionArray
+    as a Chunk if all of its elements are flat values,
+    otherwise None.
+    """
+    dtype = getattr(values, 'dtype', None)
+    if dtype is None:
+        return None
+
+    if isinstance(values, np.ndarray) and values.ndim != 1:
+        if dtype.kind not in FLAT_KINDS:
+            return None
+        values = values.ravel()
+
+    if dtype.kind in FLAT_KINDS:
+        return Chunk(values)
+
+    # Object arrays may hold nested containers
+    chunk = Chunk(values)
+    chunk.items = chunk.tolist()
+    handlers = _handlers
+    for item in chunk.items:
+        t = type(item)
+        if (handlers.get(t) or dispatch(t)) is not _iter_value:
+            return None
+    return chunk
+
+
+# A handler is called as `handler(arg, field, iterkeys)` and returns
+#   None    - `arg` is a single value
+#   Chunk   - a flat block of values
+#   Iterable - the children of `arg` to iterate over
+Handler = Callable[[Any, str, bool], Any]
+
+# Handlers registered by type
+_registry: Dict[type, Handler] = {}
+
+# Handlers resolved by type, cleared on every registration
+_handlers: Dict[type, Handler] = {}
+
+
+def register(t: type, handler: Optional[Handler] = None):
+    """
+    Register the handler `iter` uses for values of
+    the given type and its subclasses.  May be used
+    as a decorator:
+
+        @seq.register(MyContainer)
+        def iter_container(arg, field, iterkeys):
+            return arg.items
+    """
+    if handler is None:
+        def decorator(handler: Handler) -> Handler:
+            register(t, handler)
+            return handler
+        return decorator
+
+    _registry[t] = handler
+    _handlers.clear()
+    return handler
+
+
+def dispatch(t: type) -> Handler:
+    """
+    Resolve the handler for the given type by walking
+    its MRO, the result is cached per type
+    """
+    handler = _handlers.get(t)
+    if handler is not None:
+        return handler
+
+    for base in t.__mro__:
+        if base in _registry:
+            handler = _registry[base]
+            break
+
+    # Unregistered types are resolved once by their interface
+    if handler is None:
+        if hasattr(t, '__iter__'):
+            handler = _iter_iterable
+        else:
+            handler = _iter_attribute
+
+    _handlers[t] = handler
+    return handler
+
+
+def _iter_value(arg, field, iterkeys):
+    return None
+
+
+def _iter_iterable(arg, field, iterkeys):
+    return arg
+
+
+def _iter_attribute(arg, field, iterkeys):
+    if field and hasattr(arg, field):
+        return (getattr(arg, field),)
+    return None
+
+
+def _iter_array(arg, field, iterkeys):
+    # Flat arrays are emitted in bulk
+    chunk = bulk(arg)
+    if chunk is None:
+        return arg
+    return chunk
+
+
+def _iter_dataframe(arg: DataFrame, field, iterkeys):
+    if not field:
+        if iterkeys:
+            return (arg.index,)
+    elif field in arg.columns:
+        return (arg[field],)
+    elif arg.index.name == field:
+        return (arg.index,)
+    return ()
+
+
+def _iter_series(arg: Series, field, iterkeys):
+    if field and arg.index.name == field:
+        return (arg.index,)
+    elif iterkeys:
+        return (arg.index,)
+    else:
+        return (arg.values,)
+
+
+def _iter_dict(arg: dict, field, iterkeys):
+    if field and field in arg:
+        return (arg[field],)
+    elif iterkeys:
+        return arg.keys()
+    else:
+        return arg.values()
+
+
+# Number of rows read at a time from file sources
+CHUNKSIZE = 100_000
+
+
+class Source:
+    """
+    A CSV, JSON Lines or JSON file, a DataFrame saved in
+    the 'npy' storage format, or a directory of them such
+    as one written by `Model.save`, whose rows are streamed
+    in chunks rather than loaded all at once.
+    Create one with `read`.
+    """
+
+    def __init__(self, path, chunksize: int = CHUNKSIZE, **kwargs):
+        self.path = Path(path)
+        self.chunksize = chunksize
+        self.kwargs = kwargs
+
+    def __repr__(self) -> str:
+        return f'Source("{self.path}")'
+
+    def frames(self, field='', iterkeys=True) -> Generator:
+        """
+        Yield the contents of the source as DataFrames
+        of at most `chunksize` rows, reading only the
+        column named `field` if one is given
+        """
+        if self.path.is_dir() and not storage.is_npy(self.path):
+            paths = sorted(self.path.iterdir())
+        else:
+            paths = [self.path]
+
+        for path in paths:
+            suffix = path.suffix.lower()
+            if path.name == storage.MANIFEST or suffix in storage.TEMP_SUFFIXES:
+                continue
+            elif path.is_dir():
+                if storage.is_npy(path):
+                    yield from self._read_npy(path, field, iterkeys)
+            elif suffix == '.csv':
+                yield from self._read_csv(path, field, iterkeys)
+            elif suffix in ('.jsonl', '.ndjson'):
+                yield from pd.read_json(path, lines=True, chunksize=self.chunksize, **self.kwargs)
+            elif suffix == '.json':
+                yield from self._read_json(path, field)
+
+    def _read_csv(self, path, field, iterkeys) -> Generator:
+        columns = pd.read_csv(path, nrows=0, **self.kwargs).columns
+        if field:
+            if field not in columns:
+                return
+            usecols = [field]
+        elif iterkeys and len(columns):
+            # Only the row numbers are needed
+            usecols = [columns[0]]
+        else:
+            return
+
+        yield from pd.read_csv(path, usecols=usecols, chunksize=self.chunksize, **self.kwargs)
+
+    def _read_npy(self, path, field, iterkeys) -> Generator:
+        # Memory-mapped so only the sliced rows are paged in
+        df = storage.get('npy').load(path, mmap=True, columns=[field] if field else None)
+        if field:
+            if field not in df.columns:
+                return
+        elif iterkeys and len(df.columns):
+            df = df.iloc[:, :1]
+        else:
+            return
+
+        for start in range(0, len(df), self.chunksize):
+            yield df.iloc[start:start + self.chunksize]
+
+    def _read_json(self, path, field) -> Generator:
+        # A model record is only relevant if it has the field
+        with path.open('r') as file:
+            record = json.load(file)
+        if not field or not isinstance(record, dict) or field in record:
+            yield record
+
+
+def read(path, chunksize: int = CHUNKSIZE, **kwargs) -> Source:
+    """
+    Stream the given file or directory through `iter`,
+    extra arguments are passed to the pandas reader.
+
+    eg:
+        lst.distinct(seq.read('trips.csv'), field='trv_id')
+        set.make(seq.read('saved/model'), field='trv_id')
+    """
+    return Source(path, chunksize=chunksize, **kwargs)
+
+
+def _iter_source(arg: Source, field, iterkeys):
+    return arg.frames(field, iterkeys)
+
+
+register(str, _iter_value)
+register(int, _iter_value)
+register(float, _iter_value)
+register(complex, _iter_value)
+register(type(None), _iter_value)
+register(list, _iter_iterable)
+register(tuple, _iter_iterable)
+register(set, _iter_iterable)
+register(frozenset, _iter_iterable)
+register(GeneratorType, _iter_iterable)
+register(dict, _iter_dict)
+register(DataFrame, _iter_dataframe)
+register(Series, _iter_series)
+register(np.ndarray, _iter_array)
+register(Index, _iter_array)
+register(ExtensionArray, _iter_array)
+register(Source, _iter_source)
+
+
+def iter(*args, field='', method: Method = 'keys', max_depth: Optional[int] = None) -> Generator:
     """
     Iterate over the given arguments
 
@@ -23,74 +334,246 @@ def iter(*args, field='', method: Method = 'keys') -> Generator:
         If strict, dataframes passed in much have the
         column specified under 'field'
     method: Union['keys', 'values']
+    max_depth: Optional[int]
+        If given, containers nested deeper than this
+        are yielded as is rather than flattened
     eg:
         iterate(1, 2, 3, [4,5,6]) == [1,2,3,4,5,6]
         iterate(pd.Series(), set([1,2,3]), 1,2,3, unique=True) = [1,2,3]
         iterate(..dataframes, field='name', sort=True) == [1,2,3,4,.....]
         iterate(False) == [False]
         iterate([1,2],None, allow_none=True) == [1, 2, None]
+        iterate([1,[2,[3]]], max_depth=2) == [1,2,[3]]
+
+    A ValueError is raised if a container contains itself.
     """
     
+    for item in chunks(*args, field=field, method=method, max_depth=max_depth):
+        if type(item) is Chunk:
+            yield from item.tolist()
+        else:
+            yield item
+
+
+def chunks(*args, field='', method: Method = 'keys', max_depth: Optional[int] = None) -> Generator:
+    """
+    Iterate over the given arguments as `iter` does
+    but yield flat arrays as a single Chunk rather
+    than one element at a time.
+
+    The arguments are flattened with an explicit stack
+    so each value costs the same regardless of how
+    deeply it is nested.
+    """
     iterkeys = method == 'keys'
-    
-    def recurse(arg):
-        t = type(arg)
-        n = t.__name__
-        log.debug(f'iter {n} = {arg}')
-
-        # Pandas DataFrames
-        if isinstance(arg, DataFrame):
-            if not field:
-                if iterkeys:
-                    yield from recurse(arg.index)
-            elif field in arg.columns:
-                yield from recurse(arg[field])
-            elif arg.index.name == field:
-                yield from recurse(arg.index)
-
-        # Pandas Series
-        elif isinstance(arg, Series):
-            if not field:
-                if iterkeys:
-                    yield from recurse(arg.index)
-                else:
-                    yield from recurse(arg.values)
-            elif arg.index.name == field:
-                yield from recurse(arg.index)
-            elif iterkeys:
-                yield from recurse(arg.index)
-            else:
-                yield from recurse(arg.values)
-
-        # Dictionary
-        elif isinstance(arg, dict):
-            
-            if field and field in arg:
-                yield from recurse(arg[field])
-            elif iterkeys:
-                for key in arg.keys():
-                    yield from recurse(key)
+    limit = sys.maxsize if max_depth is None else max_depth
+    handlers = _handlers
+
+    # Iterators over the containers being expanded
+    stack = [builtins.iter(args)]
+    # The containers themselves, kept alive so their ids stay unique
+    nodes: list = [args]
+    path = {id(args)}
+
+    while stack:
+        for arg in stack[-1]:
+            # Nested deeper than allowed
+            if len(stack) > limit:
+                yield arg
+                continue
+
+            t = type(arg)
+            handler = handlers.get(t) or dispatch(t)
+            result = handler(arg, field, iterkeys)
+
+            if result is None:
+                yield arg
+            elif type(result) is Chunk:
+                yield result
             else:
-                for val in arg.values():
-                    yield from recurse(val)
-            
-        # Iterable
-        elif hasattr(arg, '__iter__') and not isinstance(arg, str):
-            for item in arg:
-                yield from recurse(item)
-
-        # Has the specific field
-        elif hasattr(arg, field):
-            yield from recurse(getattr(arg, field))
-
-        # Must be a value
+                key = id(arg)
+                if key in path:
+                    raise ValueError(f'Cycle detected while iterating {t.__name__} {arg!r:.80}')
+                path.add(key)
+                nodes.append(arg)
+                stack.append(builtins.iter(result))
+                break
         else:
-            log.debug('iterate %s', arg)
-            yield arg
-    
+            stack.pop()
+            path.discard(id(nodes.pop()))
+
+
+def to_array(*args, field='', method: Method = 'keys', max_depth: Optional[int] = None, distinct=False, sort=False, dtype=None) -> np.ndarray:
+    """
+    Collect the given arguments into a single ndarray.
+
+    Array-like inputs are concatenated directly, only
+    the scalars in between are boxed into arrays.  Arguments
+    are the same as `iter`.
+
+    distinct: bool
+        If true, duplicate values are removed keeping
+        the first occurrence of each
+    sort: bool
+        If true, the values are sorted
+    dtype:
+        If given, the result is cast to this dtype
+
+    eg:
+        to_array(1, 2, [3, 4]) == np.array([1, 2, 3, 4])
+        to_array(df1, df2, field='id', distinct=True)
+    """
+    parts = []
+    scalars = []
+
+    for item in chunks(*args, field=field, method=method, max_depth=max_depth):
+        if type(item) is Chunk:
+            if scalars:
+                parts.append(_box(scalars))
+                scalars = []
+            parts.append(item.array())
+        else:
+            scalars.append(item)
+
+    if scalars:
+        parts.append(_box(scalars))
+
+    array = _concat(parts)
+
+    if dtype is not None:
+        array = array.astype(dtype, copy=False)
+
+    if distinct and sort:
+        array = np.unique(array)
+    elif distinct:
+        array = pd.unique(array)
+    elif sort:
+        array = np.sort(array)
+
+    return array
+
+
+def _box(scalars: list) -> np.ndarray:
+    """
+    Box a list of scalars into an ndarray, letting pandas
+    infer the dtype only when every scalar is of the same
+    plain type so that no value is converted
+    """
+    types = {type(value) for value in scalars}
+    if len(types) == 1 and issubclass(types.pop(), BOXABLE_TYPES):
+        return Series(scalars).to_numpy()
+    return _objects(scalars)
+
+
+def _objects(values: list) -> np.ndarray:
+    """
+    A one dimensional object array holding the given values
+    as they are, even when they are themselves sequences
+    """
+    return np.fromiter(values, dtype=object, count=len(values))
+
+
+def _concat(parts: list) -> np.ndarray:
+    """
+    Concatenate the arrays, falling back to an object
+    array rather than converting values between kinds
+    """
+    if not parts:
+        return np.array([], dtype=object)
+
+    if len(parts) == 1:
+        return parts[0]
+
+    kinds = {part.dtype.kind for part in parts}
+    if len(kinds) > 1:
+        parts = [part.astype(object) for part in parts]
+
+    return np.concatenate(parts)
+
+
+def distinct(*args, field='', method: Method = 'keys', max_depth: Optional[int] = None) -> Generator:
+    """
+    Iterate over the distinct values of the given
+    arguments in the order they first occur.  Memory
+    grows with the number of distinct values only.
+    """
+    seen = set()
+    for item in chunks(*args, field=field, method=method, max_depth=max_depth):
+        if type(item) is Chunk:
+            values = Chunk(pd.unique(item.values)).tolist()
+        else:
+            values = (item,)
+
+        for value in values:
+            if value not in seen:
+                seen.add(value)
+                yield value
+
+
+def sort(*args, field='', method: Method = 'keys', max_depth: Optional[int] = None, distinct=False, run_size=1_000_000) -> Generator:
+    """
+    Iterate over the values of the given arguments in
+    sorted order.  Values are sorted in runs of `run_size`
+    which are spilled to disk and merged, so memory is
+    bounded by `run_size` rather than the input size.
+
+    distinct: bool
+        If true, duplicate values are skipped
+    """
+    runs = []
+    run = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for value in iter(*args, field=field, method=method, max_depth=max_depth):
+            run.append(value)
+            if len(run) >= run_size:
+                runs.append(_spill(builtins.sorted(run), Path(tmp) / f'{len(runs)}.run'))
+                run = []
+
+        run.sort()
+        if runs:
+            runs.append(_spill(run, Path(tmp) / f'{len(runs)}.run'))
+            run = []
+            values = heapq.merge(*[_unspill(path) for path in runs])
+        else:
+            values = run
 
-    yield from recurse(args)
+        if not distinct:
+            yield from values
+            return
 
+        last = missing = object()
+        for value in values:
+            if last is missing or value != last:
+                yield value
+            last = value
+
+
+# Number of values pickled together when spilling a run
+_SPILL_BLOCK = 10_000
+
+
+def _spill(run: list, path: Path) -> Path:
+    """
+    Write the sorted run to disk in blocks
+    """
+    with path.open('wb') as file:
+        for i in range(0, len(run), _SPILL_BLOCK):
+            pickle.dump(run[i:i + _SPILL_BLOCK], file, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _unspill(path: Path) -> Generator:
+    """
+    Read a spilled run back one block at a time
+    """
+    with path.open('rb') as file:
+        while True:
+            try:
+                block = pickle.load(file)
+            except EOFError:
+                return
+            yield from block
 
 
 def enumerate1(seq: Sequence[T]) -> Generator[Tuple[int, T], None, None]:
@@ -117,4 +600,76 @@ def pairwise(seq: Sequence[T]) -> Generator[Tuple[T,T], None, None]:
     yield
 
   for i,j in zip(a,b):
-    yield i,j
\ No newline at end of file
+    yield i,j
+
+def window(seq: Sequence[T], k: int, step: int = 1) -> Union[np.ndarray, Generator[Tuple[T, ...], None, None]]:
+    """
+    Sliding windows of `k` elements over the given
+    sequence, advancing `step` elements each time.
+
+    For ndarrays and Series a read-only 2D view of
+    shape (windows, k) is returned without copying,
+    otherwise a generator of tuples is returned.
+
+    eg:
+        list(window([1,2,3,4], 2)) == [(1,2), (2,3), (3,4)]
+        window(np.arange(5), 3, step=2) == [[0,1,2], [2,3,4]]
+    """
+    if k < 1 or step < 1:
+        raise ValueError(f'window size {k} and step {step} must be positive')
+
+    if isinstance(seq, Series):
+        seq = seq.to_numpy()
+
+    if isinstance(seq, np.ndarray) and seq.ndim == 1:
+        if len(seq) < k:
+            return np.empty((0, k), dtype=seq.dtype)
+        return np.lib.stride_tricks.sliding_window_view(seq, k)[::step]
+
+    return _window(seq, k, step)
+
+
+def _window(seq, k: int, step: int) -> Generator:
+    buffer = deque(maxlen=k)
+    skip = 0
+    for item in seq:
+        buffer.append(item)
+        if len(buffer) < k:
+            continue
+        if skip:
+            skip -= 1
+            continue
+        yield tuple(buffer)
+        skip = step - 1
+
+
+def chunked(seq: Sequence[T], n: int) -> Generator:
+    """
+    Split the given sequence into consecutive batches
+    of `n` elements, the last may be shorter.
+
+    ndarrays and Series are split into views,
+    other sequences into lists.
+
+    eg:
+        list(chunked([1,2,3,4,5], 2)) == [[1,2], [3,4], [5]]
+    """
+    if n < 1:
+        raise ValueError(f'chunk size {n} must be positive')
+
+    if isinstance(seq, Series):
+        for i in range(0, len(seq), n):
+            yield seq.iloc[i:i + n]
+        return
+
+    if isinstance(seq, np.ndarray):
+        for i in range(0, len(seq), n):
+            yield seq[i:i + n]
+        return
+
+    items = builtins.iter(seq)
+    while True:
+        batch = list(islice(items, n))
+        if not batch:
+            return
+        yield batch
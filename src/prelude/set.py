@@ -1,11 +1,17 @@
-from typing import Tuple, Set
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import MutableSet, Set as AbstractSet
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Tuple, Set, Union
+import numpy as np
+import pandas as pd
+from pandas import Series
 from . import seq
 
 def empty():
     return set()
 
 
-def make(*args, field='', method='keys') -> Set:
+def make(*args, field='', method='keys', max_depth=None) -> Set:
     """
     Convert the given argument to a set.
 
@@ -17,6 +23,8 @@ def make(*args, field='', method='keys') -> Set:
     If exists, function will be applied to the elements
     field: Optional[str]
     If given, dataframes will have this field extracted
+    max_depth: Optional[int]
+    If given, containers nested deeper are not flattened
     error_if_empty: bool
     If true, an error is thrown if the resulting list is empty
     debug: bool
@@ -37,31 +45,428 @@ def make(*args, field='', method='keys') -> Set:
     """
 
     items = empty()
-    for item in seq.iter(*args, field=field, method=method):
-        items.add(item)
+    for item in seq.chunks(*args, field=field, method=method, max_depth=max_depth):
+        if type(item) is seq.Chunk:
+            items.update(item.tolist())
+        else:
+            items.add(item)
 
     return items
 
 
-def sort(*args, **kwargs) -> Set:
+class SortedSet(MutableSet):
+    """
+    A set that keeps its elements in sorted order.
+
+    Elements are stored in a list of sorted blocks so
+    membership is O(1), insertion and removal touch a
+    single block, and rank and range queries are a
+    bisect over the blocks then within one block.
+
+    eg:
+    s = SortedSet([5, 1, 3])
+    list(s) == [1, 3, 5]
+    s.bisect_left(3) == 1
+    list(s.irange(2, 5)) == [3, 5]
+    """
+
+    # Target number of elements per block
+    LOAD = 1000
+
+    def __init__(self, iterable=()):
+        self._set = set(iterable)
+        self._build(sorted(self._set))
+
+    @classmethod
+    def from_sorted(cls, values) -> 'SortedSet':
+        """
+        Create a SortedSet from values that are already
+        sorted in O(n), adjacent duplicates are dropped
+        """
+        items = []
+        for value in values:
+            if not items or items[-1] != value:
+                items.append(value)
+        instance = cls.__new__(cls)
+        instance._set = set(items)
+        instance._build(items)
+        return instance
+
+    @classmethod
+    def _from_iterable(cls, iterable) -> 'SortedSet':
+        return cls(iterable)
+
+    def _build(self, items: list):
+        load = self.LOAD
+        self._lists = [items[i:i + load] for i in range(0, len(items), load)]
+        self._maxes = [block[-1] for block in self._lists]
+        self._starts: Optional[List[int]] = None
+
+    def _offsets(self) -> List[int]:
+        """
+        The index of the first element of each block
+        """
+        if self._starts is None:
+            starts = []
+            total = 0
+            for block in self._lists:
+                starts.append(total)
+                total += len(block)
+            self._starts = starts
+        return self._starts
+
+    def __contains__(self, value) -> bool:
+        return value in self._set
+
+    def __len__(self) -> int:
+        return len(self._set)
+
+    def __iter__(self) -> Iterator:
+        return chain.from_iterable(self._lists)
+
+    def __reversed__(self) -> Iterator:
+        return chain.from_iterable(reversed(block) for block in reversed(self._lists))
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)!r})'
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return list(self._islice(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'SortedSet index {index} out of range')
+        starts = self._offsets()
+        pos = bisect_right(starts, index) - 1
+        return self._lists[pos][index - starts[pos]]
+
+    def add(self, value):
+        if value in self._set:
+            return
+        self._set.add(value)
+        self._starts = None
+
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            return
+
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            pos -= 1
+        block = self._lists[pos]
+        insort(block, value)
+        self._maxes[pos] = block[-1]
+
+        # Split blocks that have grown too large
+        if len(block) > 2 * self.LOAD:
+            self._lists[pos:pos + 1] = [block[:self.LOAD], block[self.LOAD:]]
+            self._maxes[pos:pos + 1] = [block[self.LOAD - 1], block[-1]]
+
+    def discard(self, value):
+        if value not in self._set:
+            return
+        self._set.discard(value)
+        self._starts = None
+
+        pos = bisect_left(self._maxes, value)
+        block = self._lists[pos]
+        del block[bisect_left(block, value)]
+        if block:
+            self._maxes[pos] = block[-1]
+        else:
+            del self._lists[pos]
+            del self._maxes[pos]
+
+    def clear(self):
+        self._set.clear()
+        self._build([])
+
+    def copy(self) -> 'SortedSet':
+        return self.from_sorted(self)
+
+    def bisect_left(self, value) -> int:
+        """
+        The number of elements less than `value`
+        """
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return len(self)
+        return self._offsets()[pos] + bisect_left(self._lists[pos], value)
+
+    def bisect_right(self, value) -> int:
+        """
+        The number of elements less than or equal to `value`
+        """
+        pos = bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            return len(self)
+        return self._offsets()[pos] + bisect_right(self._lists[pos], value)
+
+    bisect = bisect_right
+
+    def rank(self, value) -> int:
+        """
+        The index `value` has or would have in the set
+        """
+        return self.bisect_left(value)
+
+    def irange(self, minimum=None, maximum=None, inclusive=(True, True), reverse=False) -> Iterator:
+        """
+        Iterate over the elements between `minimum` and
+        `maximum`, either of which may be None for no bound
+        """
+        if minimum is None:
+            start = 0
+        elif inclusive[0]:
+            start = self.bisect_left(minimum)
+        else:
+            start = self.bisect_right(minimum)
+
+        if maximum is None:
+            stop = len(self)
+        elif inclusive[1]:
+            stop = self.bisect_right(maximum)
+        else:
+            stop = self.bisect_left(maximum)
+
+        if reverse:
+            return reversed(list(self._islice(start, stop)))
+        return self._islice(start, stop)
+
+    def _islice(self, start: int, stop: int) -> Iterator:
+        if start >= stop:
+            return
+        starts = self._offsets()
+        pos = bisect_right(starts, start) - 1
+        index = start - starts[pos]
+        remaining = stop - start
+        while remaining > 0:
+            block = self._lists[pos][index:index + remaining]
+            yield from block
+            remaining -= len(block)
+            pos += 1
+            index = 0
+
+    def _merge(self, other, keep_left: bool, keep_both: bool, keep_right: bool) -> 'SortedSet':
+        """
+        Linear merge of two sorted sets keeping the
+        elements from the requested regions
+        """
+        if not isinstance(other, SortedSet):
+            other = SortedSet(other)
+
+        items = []
+        left, right = iter(self), iter(other)
+        a, b = next(left, _END), next(right, _END)
+        while a is not _END and b is not _END:
+            if a < b:
+                if keep_left:
+                    items.append(a)
+                a = next(left, _END)
+            elif b < a:
+                if keep_right:
+                    items.append(b)
+                b = next(right, _END)
+            else:
+                if keep_both:
+                    items.append(a)
+                a, b = next(left, _END), next(right, _END)
+
+        if keep_left and a is not _END:
+            items.append(a)
+            items.extend(left)
+        if keep_right and b is not _END:
+            items.append(b)
+            items.extend(right)
+
+        return self.from_sorted(items)
+
+    def union(self, *others) -> 'SortedSet':
+        result = self.copy()
+        for other in others:
+            result = result._merge(other, True, True, True)
+        return result
+
+    def intersection(self, *others) -> 'SortedSet':
+        result = self.copy()
+        for other in others:
+            result = result._merge(other, False, True, False)
+        return result
+
+    def difference(self, *others) -> 'SortedSet':
+        result = self.copy()
+        for other in others:
+            result = result._merge(other, True, False, False)
+        return result
+
+    def symmetric_difference(self, other) -> 'SortedSet':
+        return self._merge(other, True, False, True)
+
+    def _replace(self, other: 'SortedSet'):
+        """
+        Take the elements of another SortedSet in place
+        """
+        self._set = other._set
+        self._lists = other._lists
+        self._maxes = other._maxes
+        self._starts = other._starts
+
+    def update(self, *others):
+        self._replace(self.union(*others))
+
+    def intersection_update(self, *others):
+        self._replace(self.intersection(*others))
+
+    def difference_update(self, *others):
+        self._replace(self.difference(*others))
+
+    def symmetric_difference_update(self, other):
+        self._replace(self.symmetric_difference(other))
+
+    def issubset(self, other) -> bool:
+        if not isinstance(other, AbstractSet):
+            other = set(other)
+        return len(self) <= len(other) and all(value in other for value in self._set)
+
+    def issuperset(self, other) -> bool:
+        return all(value in self._set for value in other)
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+
+
+# Marks the end of an iterator during a merge
+_END = object()
+
+
+def sort(*args, **kwargs) -> SortedSet:
     """
     Create a sorted set from the given arguments
-    """        
-    return set(sorted(make(*args, **kwargs)))
+    """
+    array = seq.to_array(*args, distinct=True, sort=True, **kwargs)
+    return SortedSet.from_sorted(seq.Chunk(array).tolist())
  
 
-def venn(a, b) -> Tuple[Set, Set, Set]:
+Region = Tuple[bool, ...]
+
+
+def venn(*args, field='', method='keys', counts_only=False):
     """
     Returns the venn diagram of the left and
     right sets, ie:
     - The elements in a only
     - The elements in both a and b
     - The elements in b only
+
+    Given more than two arguments, every region
+    is returned as a dict, see `regions`.
+
+    counts_only: bool
+        If true, the size of each region is returned
+        instead of its members
+    """
+    result = regions(*args, field=field, method=method, counts_only=counts_only)
+    if len(args) != 2:
+        return result
+
+    empty = 0 if counts_only else set()
+    return (
+        result.get((True, False), empty),
+        result.get((True, True), empty),
+        result.get((False, True), empty)
+    )
+
+
+# Regions are keyed on an int64 bitmask of the arguments
+MAX_REGION_ARGS = 62
+
+
+def regions(*args, field='', method='keys', counts_only=False) -> Dict[Region, Union[Set, int]]:
+    """
+    Returns every region of the venn diagram of the
+    given arguments, keyed by which of the arguments
+    the region is in, eg:
+
+    regions([1,2], [2,3], [3]) == {
+        (True, False, False): {1},
+        (True, True, False): {2},
+        (False, True, True): {3}
+    }
+
+    Only regions with members are returned.
+
+    Membership is computed on arrays with hashing
+    rather than with python set operations.
+
+    counts_only: bool
+        If true, the size of each region is returned
+        and the members are never materialised
+    """
+    n = len(args)
+    if not n:
+        return {}
+    if n > MAX_REGION_ARGS:
+        raise ValueError(f'regions supports at most {MAX_REGION_ARGS} arguments, not {n}')
+
+    arrays = [seq.to_array(arg, field=field, method=method) for arg in args]
+    values, codes, firsts = _factorize(arrays)
+
+    # Bitmask of the arguments each distinct value is in
+    masks = np.zeros(len(firsts), dtype=np.int64)
+    start = 0
+    for i, array in enumerate(arrays):
+        present = np.zeros(len(firsts), dtype=bool)
+        present[codes[start:start + len(array)]] = True
+        masks |= present.astype(np.int64) << i
+        start += len(array)
+
+    # Only the regions that have members
+    occurring, inverse, counts = np.unique(masks, return_inverse=True, return_counts=True)
+    keys = [tuple(bool(mask >> i & 1) for i in range(n)) for mask in occurring.tolist()]
+
+    if counts_only:
+        return {key: int(count) for key, count in zip(keys, counts)}
+
+    # Slice the values sorted by mask into one group per region,
+    # each value is its first occurrence in the arguments
+    members = Series(values, copy=False).take(firsts[np.argsort(inverse, kind='stable')])
+    stops = np.cumsum(counts)
+    starts = stops - counts
+    return {
+        key: set(seq.Chunk(members[start:stop]).tolist())
+        for key, start, stop in zip(keys, starts, stops)
+    }
+
+
+def _factorize(arrays: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    set_a = make(a)
-    set_b = make(b)
+    Concatenate the arrays and number their distinct values,
+    returning the values, the code of each value and the
+    position each code first occurs at.
+
+    Arrays of different kinds are joined as objects so that
+    no value is converted, and missing values are told apart
+    by their type, as None and nan are in a python set.
+    """
+    kinds = {array.dtype.kind for array in arrays}
+    if len(kinds) > 1:
+        arrays = [array.astype(object) for array in arrays]
+    values = np.concatenate(arrays)
+
+    # A plain ndarray gives the uniques without building an Index
+    codes, _ = pd.factorize(values)
+    nulls = np.flatnonzero(codes < 0)
+    if len(nulls):
+        types, _ = pd.factorize(np.array([type(value) for value in values[nulls]], dtype=object))
+        codes[nulls] = codes.max() + 1 + types
 
-    common = set_a.intersection(set_b)
-    a_only = set_a.difference(common)
-    b_only = set_b.difference(common)
-    return a_only, common, b_only
\ No newline at end of file
+    _, firsts = np.unique(codes, return_index=True)
+    return values, codes, firsts
@@ -0,0 +1,270 @@
+"""
+Approximate set utilities
+
+Sketches answer "how many distinct values" and
+"has this value been seen" in fixed memory, they
+accept the same arguments as `set.make` and can be
+merged when built in parallel.
+"""
+import math
+from typing import Generator, Optional, TypeVar
+import numpy as np
+import pandas as pd
+from pandas import Series
+from . import seq
+
+S = TypeVar("S", bound='Sketch')
+
+# Number of values hashed at a time
+BLOCK_SIZE = 1_000_000
+
+
+def hashes(*args, field='', method='keys', max_depth: Optional[int] = None) -> Generator[np.ndarray, None, None]:
+    """
+    Iterate over the 64 bit hashes of the values of
+    the given arguments in blocks, arguments are the
+    same as `seq.iter`.  Hashes are stable across
+    processes so sketches built separately can be merged.
+    """
+    scalars = []
+    for item in seq.chunks(*args, field=field, method=method, max_depth=max_depth):
+        if type(item) is seq.Chunk:
+            values = _widen(item.array())
+            for i in range(0, len(values), BLOCK_SIZE):
+                yield pd.util.hash_array(values[i:i + BLOCK_SIZE])
+        else:
+            scalars.append(item)
+            if len(scalars) >= BLOCK_SIZE:
+                yield _hash_scalars(scalars)
+                scalars = []
+
+    if scalars:
+        yield _hash_scalars(scalars)
+
+
+def _hash_scalars(scalars: list) -> np.ndarray:
+    """
+    Hash the scalars boxed by type, so that each hashes
+    the same as it would inside an array of its own type
+    """
+    types = Series([type(scalar) for scalar in scalars])
+    if types.nunique() == 1:
+        return pd.util.hash_array(_widen(Series(scalars).to_numpy()))
+
+    block = np.empty(len(scalars), dtype=np.uint64)
+    for index in types.groupby(types.map(id)).indices.values():
+        values = Series([scalars[i] for i in index])
+        block[index] = pd.util.hash_array(_widen(values.to_numpy()))
+    return block
+
+
+# The widest dtype of each numeric kind, equal values
+# only hash the same when they have the same width
+WIDE_DTYPES = {
+    'i': np.dtype(np.int64),
+    'u': np.dtype(np.uint64),
+    'f': np.dtype(np.float64),
+    'c': np.dtype(np.complex128),
+}
+
+
+def _widen(values: np.ndarray) -> np.ndarray:
+    """
+    Cast numeric values to the widest dtype of their kind
+    """
+    dtype = WIDE_DTYPES.get(values.dtype.kind)
+    if dtype is None:
+        return values
+    return values.astype(dtype, copy=False)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """
+    The bit length of each uint64, computed on 32 bit
+    halves so the conversion to float is exact
+    """
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+class Sketch:
+    """
+    Base class of the sketches
+    """
+
+    def add(self: S, value) -> S:
+        """
+        Add a single value to the sketch
+        """
+        return self.update([value])
+
+    def update(self: S, *args, field='', method='keys', max_depth: Optional[int] = None) -> S:
+        """
+        Add the values of the given arguments
+        to the sketch, see `set.make`
+        """
+        for block in hashes(*args, field=field, method=method, max_depth=max_depth):
+            self._add_hashes(block)
+        return self
+
+    def merge(self: S, *others: S) -> S:
+        """
+        Return a new sketch of the union of this
+        sketch and the others
+        """
+        raise NotImplementedError()
+
+    def _add_hashes(self, block: np.ndarray):
+        raise NotImplementedError()
+
+    def __or__(self: S, other: S) -> S:
+        return self.merge(other)
+
+    @classmethod
+    def make(cls, *args, field='', method='keys', max_depth: Optional[int] = None, **kwargs):
+        """
+        Create a sketch of the given arguments, keyword
+        arguments are passed to the constructor
+
+        eg:
+            HyperLogLog.make(df1, df2, field='id').count()
+        """
+        sketch = cls(**kwargs)
+        return sketch.update(*args, field=field, method=method, max_depth=max_depth)
+
+
+class HyperLogLog(Sketch):
+    """
+    Estimates the number of distinct values seen
+    using 2 ** precision one byte registers, with a
+    standard error of about 1.04 / sqrt(2 ** precision)
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f'HyperLogLog precision must be between 4 and 18, not {precision}')
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def __repr__(self) -> str:
+        return f'HyperLogLog(precision={self.precision}, count~{self.count():,})'
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _add_hashes(self, block: np.ndarray):
+        p = self.precision
+        width = 64 - p
+
+        # The first p bits pick the register, the rank is the
+        # position of the first set bit in the remaining bits
+        index = (block >> np.uint64(width)).astype(np.int64)
+        rest = block & np.uint64((1 << width) - 1)
+        rank = (width + 1 - _bit_length(rest)).astype(np.uint8)
+
+        # Max rank per register without a per value loop
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self) -> int:
+        """
+        The estimated number of distinct values
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        # Small range correction
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def merge(self, *others: 'HyperLogLog') -> 'HyperLogLog':
+        merged = HyperLogLog(self.precision)
+        merged.registers[:] = self.registers
+        for other in others:
+            if other.precision != self.precision:
+                raise ValueError(f'Cannot merge HyperLogLog of precision {other.precision} into {self.precision}')
+            np.maximum(merged.registers, other.registers, out=merged.registers)
+        return merged
+
+
+class BloomFilter(Sketch):
+    """
+    Tests whether a value has been seen, with no false
+    negatives and a false positive rate of about
+    `error_rate` once `capacity` values have been added
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError(f'Invalid BloomFilter capacity {capacity} or error rate {error_rate}')
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def __repr__(self) -> str:
+        return f'BloomFilter(capacity={self.capacity:,}, error_rate={self.error_rate})'
+
+    def __contains__(self, value) -> bool:
+        return bool(self.contains([value])[0])
+
+    def _positions(self, block: np.ndarray) -> np.ndarray:
+        # Double hashing, one row of bit positions per value
+        h1 = block & np.uint64(0xFFFFFFFF)
+        h2 = (block >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(self.hash_count, dtype=np.uint64)
+        return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.size)
+
+    def _add_hashes(self, block: np.ndarray):
+        positions = np.unique(self._positions(block))
+        index = (positions >> np.uint64(3)).astype(np.int64)
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+
+        # Combine the bits that land in the same byte
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        self.bits[index[starts]] |= np.bitwise_or.reduceat(masks, starts)
+
+    def contains(self, *args, field='', method='keys', max_depth: Optional[int] = None) -> np.ndarray:
+        """
+        Test each value of the given arguments,
+        returning an array of bools
+        """
+        results = []
+        for block in hashes(*args, field=field, method=method, max_depth=max_depth):
+            positions = self._positions(block)
+            index = (positions >> np.uint64(3)).astype(np.int64)
+            shift = (positions & np.uint64(7)).astype(np.uint8)
+            found = (self.bits[index] >> shift) & 1
+            results.append(found.all(axis=1))
+
+        if not results:
+            return np.array([], dtype=bool)
+        return np.concatenate(results)
+
+    def merge(self, *others: 'BloomFilter') -> 'BloomFilter':
+        merged = BloomFilter(self.capacity, self.error_rate)
+        merged.bits[:] = self.bits
+        for other in others:
+            if (other.size, other.hash_count) != (self.size, self.hash_count):
+                raise ValueError('Cannot merge BloomFilters with different capacity or error rate')
+            np.bitwise_or(merged.bits, other.bits, out=merged.bits)
+        return merged
+
+
+def hyperloglog(*args, field='', method='keys', precision: int = 14) -> HyperLogLog:
+    """
+    Create a HyperLogLog of the given arguments
+    """
+    return HyperLogLog.make(*args, field=field, method=method, precision=precision)
+
+
+def bloom(*args, field='', method='keys', capacity: int = 1_000_000, error_rate: float = 0.01) -> BloomFilter:
+    """
+    Create a BloomFilter of the given arguments
+    """
+    return BloomFilter.make(*args, field=field, method=method, capacity=capacity, error_rate=error_rate)
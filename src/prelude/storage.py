@@ -0,0 +1,345 @@
+"""
+Storage formats for DataFrames
+
+`Model.save` writes each DataFrame field with one of the
+formats registered here. 'csv' writes a single CSV file,
+'npy' writes a directory with a NumPy file per column and
+a `schema.json` describing them, which keeps dtypes and
+the index and lets numeric columns be memory-mapped.
+"""
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Index, Series
+from pandas.api.types import infer_dtype
+from .pth import Path
+
+# Name of the manifest in an 'npy' directory
+SCHEMA = 'schema.json'
+SCHEMA_VERSION = 1
+
+# Name of the fingerprints written by `Model.save`
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# Suffixes of the paths used while writing atomically
+TEMP_SUFFIXES = ('.tmp', '.old')
+
+
+class Storage:
+    """
+    Base class of the DataFrame storage formats
+    """
+    name = ''
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}()'
+
+    def path(self, folder: Path, name: str) -> Path:
+        """
+        The path the DataFrame called `name` is
+        stored at inside the given folder
+        """
+        raise NotImplementedError()
+
+    def save(self, df: DataFrame, path: Path) -> Path:
+        """
+        Write the DataFrame to the given path
+        """
+        raise NotImplementedError()
+
+    def load(self, path: Path, mmap=False, columns: Optional[Sequence] = None) -> DataFrame:
+        """
+        Read the DataFrame stored at the given path, only
+        reading the given columns if there are any
+        """
+        raise NotImplementedError()
+
+    def save_atomic(self, df: DataFrame, path: Path) -> Path:
+        """
+        Write the DataFrame to a temporary path alongside
+        the given one and rename it into place, so that a
+        crash never leaves a partially written DataFrame
+        """
+        self.recover(path)
+        tmp = path.with_name(path.name + TEMP_SUFFIXES[0])
+        self.remove(tmp)
+        self.save(df, tmp)
+
+        if tmp.is_dir() and path.exists():
+            # Directories can't be renamed over each other, so
+            # the previous one is moved aside first and `recover`
+            # moves it back after a crash between the renames
+            old = path.with_name(path.name + TEMP_SUFFIXES[1])
+            self.remove(old)
+            os.replace(path, old)
+            os.replace(tmp, path)
+            self.remove(old)
+        else:
+            os.replace(tmp, path)
+        return path
+
+    def recover(self, path: Path) -> bool:
+        """
+        Restore the previous DataFrame moved aside by an
+        interrupted `save_atomic`, returning True if it did
+        """
+        old = path.with_name(path.name + TEMP_SUFFIXES[1])
+        if path.exists() or not old.exists():
+            return False
+        os.replace(old, path)
+        return True
+
+    def remove(self, path: Path):
+        """
+        Delete the DataFrame stored at the given path
+        """
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+
+
+class CsvStorage(Storage):
+    """
+    A single CSV file, the index and dtypes are not kept
+    """
+    name = 'csv'
+
+    def path(self, folder: Path, name: str) -> Path:
+        return folder / f'{name}.csv'
+
+    def save(self, df: DataFrame, path: Path) -> Path:
+        df.to_csv(path, index=False)
+        return path
+
+    def load(self, path: Path, mmap=False, columns: Optional[Sequence] = None) -> DataFrame:
+        return pd.read_csv(path, usecols=columns)
+
+
+class NpyStorage(Storage):
+    """
+    A directory with a `.npy` file per column and a schema
+    manifest. Numeric, boolean, datetime and timedelta
+    columns are stored as their arrays, categoricals as
+    their codes and string columns as UTF-8 bytes with
+    the offset of each string.
+    Any other column falls back to a CSV file of its own
+    and is cast back to its dtype when loaded.
+    """
+    name = 'npy'
+
+    def path(self, folder: Path, name: str) -> Path:
+        return folder / name
+
+    def save(self, df: DataFrame, path: Path) -> Path:
+        if path.exists():
+            self.remove(path)
+        path.mkdir(parents=True)
+
+        schema = dict(
+            format=self.name,
+            version=SCHEMA_VERSION,
+            rows=len(df),
+            index=_save_index(df.index, path, 'index'),
+            columns=_save_index(df.columns, path, 'columns'),
+            data=[_save_values(df.iloc[:, i], path, str(i)) for i in range(df.shape[1])]
+        )
+
+        with (path / SCHEMA).open('w') as file:
+            json.dump(schema, file, default=str)
+
+        return path
+
+    def load(self, path: Path, mmap=False, columns: Optional[Sequence] = None) -> DataFrame:
+        with (path / SCHEMA).open('r') as file:
+            schema = json.load(file)
+
+        names = _load_index(schema['columns'], path, mmap)
+        if columns is None:
+            positions = list(range(len(names)))
+        else:
+            wanted = set(columns)
+            positions = [i for i, name in enumerate(names) if name in wanted]
+
+        # Positional keys keep duplicate column names apart,
+        # copy=False keeps the memory-mapped arrays as they are
+        data = {i: _load_values(schema['data'][i], path, mmap) for i in positions}
+        index = _load_index(schema['index'], path, mmap)
+        df = DataFrame(data, index=index, copy=False)
+        df.columns = names[positions]
+        return df
+
+
+def _save_values(values: Union[Series, Index], folder: Path, stem: str) -> Dict:
+    """
+    Write the values of a column or index level,
+    returning their entry in the schema
+    """
+    values = Series(values, copy=False) if isinstance(values, Index) else values
+    dtype = values.dtype
+    entry = dict(dtype=str(dtype), file=f'{stem}.npy')
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        entry.update(kind='category', ordered=bool(dtype.ordered))
+        entry['categories'] = _save_values(Series(dtype.categories), folder, f'{stem}.categories')
+        array = values.cat.codes.to_numpy()
+    elif isinstance(dtype, pd.DatetimeTZDtype):
+        entry.update(kind='datetimetz', tz=str(dtype.tz))
+        array = values.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+    elif isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+        entry.update(kind='array')
+        array = values.to_numpy()
+    elif dtype == object and infer_dtype(values, skipna=False) in ('string', 'empty'):
+        # UTF-8 bytes and offsets, as fixed width unicode
+        # would pay for the longest string on every row
+        entry.update(kind='utf8', offsets=f'{stem}.offsets.npy')
+        encoded = [value.encode('utf-8') for value in values.to_numpy()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        np.save(folder / entry['offsets'], offsets, allow_pickle=False)
+        array = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    else:
+        entry.update(kind='csv', file=f'{stem}.csv')
+        values.to_frame().to_csv(folder / entry['file'], index=False)
+        return entry
+
+    np.save(folder / entry['file'], array, allow_pickle=False)
+    return entry
+
+
+def _load_values(entry: Dict, folder: Path, mmap=False) -> Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """
+    Read the values described by a schema entry
+    """
+    path = folder / entry['file']
+    kind = entry['kind']
+
+    if kind == 'csv':
+        series = pd.read_csv(path).iloc[:, 0]
+        try:
+            series = series.astype(entry['dtype'])
+        except (TypeError, ValueError):
+            pass
+        return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+    # Copy on write maps so the frame stays mutable
+    array = np.load(path, mmap_mode='c' if mmap else None, allow_pickle=False)
+    if kind == 'category':
+        categories = _load_values(entry['categories'], folder)
+        return pd.Categorical.from_codes(array, categories=categories, ordered=entry['ordered'])
+    if kind == 'datetimetz':
+        return pd.DatetimeIndex(array, tz='UTC').tz_convert(entry['tz']).array
+    if kind == 'utf8':
+        offsets = np.load(folder / entry['offsets'], allow_pickle=False)
+        return _decode_utf8(array, offsets)
+    return array
+
+
+def _decode_utf8(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Decode the strings stored as UTF-8 bytes and offsets
+    into an object array.  The bytes are decoded in one go
+    and split on a NUL inserted between each string, falling
+    back to a string at a time if any contain a NUL.
+    """
+    strings = np.empty(len(offsets) - 1, dtype=object)
+    if not len(strings):
+        return strings
+
+    if (data == 0).any():
+        data = data.tobytes()
+        bounds = offsets.tolist()
+        strings[:] = [data[start:stop].decode('utf-8') for start, stop in zip(bounds[:-1], bounds[1:])]
+    else:
+        strings[:] = np.insert(data, offsets[1:-1], 0).tobytes().decode('utf-8').split('\0')
+    return strings
+
+
+def _save_index(index: Index, folder: Path, stem: str) -> Dict:
+    """
+    Write the given row or column index, returning
+    its entry in the schema
+    """
+    if isinstance(index, pd.RangeIndex):
+        return dict(kind='range', start=index.start, stop=index.stop, step=index.step, names=[index.name])
+
+    levels = [_save_values(index.get_level_values(i), folder, f'{stem}.{i}') for i in range(index.nlevels)]
+    return dict(kind='levels', levels=levels, names=list(index.names))
+
+
+def _load_index(entry: Dict, folder: Path, mmap=False) -> Index:
+    names = entry['names']
+    if entry['kind'] == 'range':
+        return pd.RangeIndex(entry['start'], entry['stop'], entry['step'], name=names[0])
+
+    arrays = [_load_values(level, folder, mmap) for level in entry['levels']]
+    if len(arrays) == 1:
+        return Index(arrays[0], name=names[0])
+    return pd.MultiIndex.from_arrays(arrays, names=names)
+
+
+# Registered formats by name
+storages: Dict[str, Storage] = {}
+
+
+def register(storage: Storage) -> Storage:
+    """
+    Register a storage format under its name
+    """
+    storages[storage.name] = storage
+    return storage
+
+
+def get(name: str) -> Storage:
+    """
+    The storage format registered under the given name
+    """
+    try:
+        return storages[name]
+    except KeyError:
+        raise ValueError(f'Unknown storage format "{name}", expected one of {list(storages)}') from None
+
+
+def find(folder: Path, name: str) -> Optional[Tuple[Storage, Path]]:
+    """
+    The storage format and path of the DataFrame called
+    `name` saved inside the given folder, if there is one,
+    recovering it from an interrupted save if need be
+    """
+    for storage in storages.values():
+        path = storage.path(folder, name)
+        if path.exists() or storage.recover(path):
+            return storage, path
+    return None
+
+
+def fingerprint(df: DataFrame) -> Optional[str]:
+    """
+    A digest of the values, index, columns and dtypes of
+    the DataFrame, None if it holds unhashable values
+    """
+    try:
+        rows = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    except TypeError:
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(rows.tobytes())
+    digest.update(repr((list(df.columns), [str(t) for t in df.dtypes], list(df.index.names))).encode())
+    return digest.hexdigest()
+
+
+def is_npy(path: Path) -> bool:
+    """
+    True if the path is a directory written by `NpyStorage`
+    """
+    return (path / SCHEMA).is_file()
+
+
+register(CsvStorage())
+register(NpyStorage())
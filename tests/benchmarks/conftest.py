@@ -0,0 +1,81 @@
+"""
+Benchmark fixtures
+
+    pytest tests/benchmarks --prelude-bench --prelude-bench-save=before.json
+    pytest tests/benchmarks --prelude-bench --prelude-bench-compare=before.json
+
+Each benchmark records the best time of several rounds, the
+compare mode fails any benchmark slower than the saved result
+by more than --prelude-bench-threshold.
+"""
+import json
+import platform
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Dict
+from pytest import fail, fixture, skip
+
+# Results of every benchmark run this session
+results: Dict[str, Dict] = {}
+
+
+class Benchmark:
+
+    def __init__(self, baseline: Dict, threshold: float):
+        self.baseline = baseline
+        self.threshold = threshold
+
+    def __call__(self, name: str, function: Callable, *args, rounds=5, number=1, **kwargs):
+        """
+        Time `function(*args, **kwargs)` over the given number
+        of rounds, returning the result of the last call
+        """
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for _ in range(number):
+                result = function(*args, **kwargs)
+            times.append((time.perf_counter() - start) / number)
+
+        seconds = min(times)
+        results[name] = dict(seconds=seconds, mean=statistics.mean(times), rounds=rounds)
+
+        previous = self.baseline.get(name)
+        if previous:
+            limit = previous['seconds'] * (1 + self.threshold)
+            if seconds > limit:
+                fail(f'{name} regressed: {seconds:.6f}s vs {previous["seconds"]:.6f}s (limit {limit:.6f}s)')
+
+        return result
+
+
+@fixture(scope='session')
+def baseline(request) -> Dict:
+    path = request.config.getoption('--prelude-bench-compare')
+    if not path:
+        return {}
+    with open(path, 'r') as file:
+        return json.load(file)['benchmarks']
+
+
+@fixture
+def benchmark(request, baseline) -> Benchmark:
+    if not request.config.getoption('--prelude-bench'):
+        skip('benchmarks only run with --prelude-bench')
+    return Benchmark(baseline, request.config.getoption('--prelude-bench-threshold'))
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('--prelude-bench-save', default='')
+    if not path or not results:
+        return
+
+    record = dict(
+        python=platform.python_version(),
+        machine=platform.machine(),
+        time=time.time(),
+        benchmarks=results
+    )
+    with Path(path).open('w') as file:
+        json.dump(record, file, indent=2)
@@ -0,0 +1,118 @@
+import subprocess
+import sys
+import numpy as np
+from attrs import define, field
+from pandas import DataFrame
+from pytest import mark
+from typing import List
+from src.prelude import *
+from src.prelude import storage
+from src.prelude.model import list_field
+
+SIZES = [10_000, 1_000_000]
+
+
+def make_df(rows: int) -> DataFrame:
+    return DataFrame(dict(
+        id=np.arange(rows),
+        name=np.arange(rows).astype(str),
+        value=np.random.default_rng(0).random(rows)
+    ))
+
+
+@define
+class Child(Model):
+    name : str = field(default='')
+    id   : int = field(default=0)
+
+
+@define
+class Parent(Model):
+    children : List[Child] = list_field()
+    name : str = field(default='')
+
+
+@define
+class FrameModel(Model):
+    name : str = field(default='')
+    a : DataFrame = field(factory=DataFrame)
+    b : DataFrame = field(factory=DataFrame)
+
+
+@mark.parametrize('rows', SIZES)
+def test_seq_iter(benchmark, rows):
+    df = make_df(rows)
+    benchmark(f'seq.iter[{rows}]', lambda: sum(1 for _ in seq.iter(df, field='id', method='values')))
+
+
+@mark.parametrize('rows', SIZES)
+def test_lst_make(benchmark, rows):
+    df = make_df(rows)
+    benchmark(f'lst.make[{rows}]', lst.make, df, field='id')
+
+
+@mark.parametrize('rows', SIZES)
+def test_set_make(benchmark, rows):
+    df = make_df(rows)
+    benchmark(f'set.make[{rows}]', set.make, df, field='name', method='values')
+
+
+def test_datetime_parse(benchmark):
+    strings = [f'2023-01-{d:02}T{h:02}:30:00+10:00' for d in range(1, 29) for h in range(24)]
+
+    def parse():
+        # Measure parsing rather than cache hits
+        dt.parse_cache.clear()
+        return [dt.datetime(s, warn_on_localize=False) for s in strings]
+
+    benchmark('dt.datetime[672]', parse)
+
+
+def test_date_parse(benchmark):
+    strings = [f'2023-{m:02}-{d:02}' for m in range(1, 13) for d in range(1, 29)]
+
+    def parse():
+        dt.parse_cache.clear()
+        return [dt.date(s) for s in strings]
+
+    benchmark('dt.date[336]', parse)
+
+
+@mark.parametrize('rows', SIZES)
+def test_model_save_load(benchmark, rows, tmp_path):
+    model = FrameModel(name='x', a=make_df(rows), b=make_df(rows // 2))
+    path = benchmark(f'Model.save[{rows}]', model.save, tmp_path / 'model', incremental=False, rounds=3)
+    benchmark(f'Model.load[{rows}]', FrameModel.load, path, rounds=3)
+
+
+@mark.parametrize('rows', SIZES)
+def test_model_save_load_npy(benchmark, rows, tmp_path):
+    model = FrameModel(name='x', a=make_df(rows), b=make_df(rows // 2))
+    path = benchmark(f'Model.save[npy,{rows}]', model.save, tmp_path / 'model', format='npy', incremental=False, rounds=3)
+    benchmark(f'Model.load[npy,mmap,{rows}]', FrameModel.load, path, mmap=True, rounds=3)
+
+
+@mark.parametrize('rows', SIZES)
+def test_npy_load_strings(benchmark, rows, tmp_path):
+    npy = storage.get('npy')
+    path = npy.save(make_df(rows)[['name']], tmp_path / 'strings')
+    benchmark(f'NpyStorage.load[strings,mmap,{rows}]', npy.load, path, mmap=True, rounds=3)
+
+
+@mark.parametrize('rows', SIZES)
+def test_model_save_unchanged(benchmark, rows, tmp_path):
+    # Every round after the first save finds nothing to write
+    model = FrameModel(name='x', a=make_df(rows), b=make_df(rows // 2))
+    path = model.save(tmp_path / 'model')
+    benchmark(f'Model.save[unchanged,{rows}]', model.save, path, rounds=3)
+
+
+@mark.parametrize('children', [100, 10_000])
+def test_model_copy(benchmark, children):
+    model = Parent(name='p', children=[Child(name=str(i), id=i) for i in range(children)])
+    benchmark(f'Model.copy[{children}]', model.copy)
+
+
+def test_import(benchmark):
+    command = [sys.executable, '-c', 'import src.prelude']
+    benchmark('import prelude', subprocess.run, command, check=True, rounds=3)
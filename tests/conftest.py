@@ -1 +1,11 @@
-from pytest import fixture, mark
+def pytest_addoption(parser):
+    # Prefixed so they don't clash with the pytest-benchmark plugin
+    group = parser.getgroup('prelude-bench')
+    group.addoption('--prelude-bench', action='store_true', default=False,
+        help='Run the benchmarks in tests/benchmarks')
+    group.addoption('--prelude-bench-save', default='',
+        help='Write the benchmark results to this JSON file')
+    group.addoption('--prelude-bench-compare', default='',
+        help='Fail benchmarks that regressed against this JSON file')
+    group.addoption('--prelude-bench-threshold', type=float, default=0.25,
+        help='Allowed slowdown against the compared results, 0.25 = 25%%')
@@ -1,5 +1,5 @@
 from src.prelude import *
-from pandas import DataFrame, Series
+from pandas import DataFrame, Series, Index
 
 def test_df_list_keys():
     df = DataFrame(dict(a=[1,2,3]), index=['a','b','c'])
@@ -11,3 +11,13 @@ def test_df_list_vals():
 
 def test_series_set():
   assert set.make(Series([1,2,3], index=['a','b','a']), method='values') == {1,2,3}
+
+
+def test_series_bulk_chunk():
+  s = Series([1,2,3])
+  chunks = list(seq.chunks(s, method='values'))
+  assert len(chunks) == 1
+  assert chunks[0].tolist() == [1,2,3]
+
+def test_nested_index_list():
+  assert lst.make(Index([1,[2,3],'a'])) == [1,2,3,'a']
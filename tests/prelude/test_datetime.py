@@ -11,3 +11,160 @@ def test_times():
 def test_dates():
     assert dt.today().add(days=1) == dt.tomorrow()
     assert dt.tomorrow().add(days=-2) == dt.yesterday()
+
+
+def test_datetimes():
+    from pandas import Series
+    times = dt.datetimes(Series(['2020-01-01 10:00', '2020-01-01 12:00+02:00']), tz='Australia/Brisbane')
+    assert str(times.dt.tz) == 'Australia/Brisbane'
+    assert times.dt.hour.tolist() == [20, 20]
+    assert times[0] == dt.datetime('2020-01-01 10:00', tz='Australia/Brisbane')
+
+    offset = dt.datetimes(['2020-01-01'], tz=10)
+    assert offset.hour.tolist() == [10]
+    assert offset[0].utcoffset().total_seconds() == 36000
+
+
+def test_dates_bulk():
+    dates = dt.dates(['01/02/2020', '03/04/2021'], format='DD/MM/YYYY')
+    assert [d.date() for d in dates] == [dt.date('2020-02-01'), dt.date('2021-04-03')]
+
+
+def test_parse_cache():
+    dt.parse_cache.clear()
+    first = dt.datetime('2020-01-01 10:00', tz='Australia/Brisbane', warn_on_localize=False)
+    second = dt.datetime('2020-01-01 10:00', tz='Australia/Brisbane', warn_on_localize=False)
+    assert first == second
+    assert dt.parse_cache.stats()['hits'] == 1
+    assert dt.date('2020-01-01') == dt.date('2020-01-01')
+    assert dt.parse_cache.stats()['misses'] == 2
+
+
+def test_parse_cache_relative():
+    import time
+    from src.prelude import pandas_utils
+    dt.parse_cache.clear()
+    first = dt.datetime('now', warn_on_localize=False)
+    stamp = pandas_utils.to_timestamp('now')
+    time.sleep(0.01)
+    assert dt.datetime('now', warn_on_localize=False) > first
+    assert pandas_utils.to_timestamp('now') > stamp
+    assert len(dt.parse_cache) == 0
+
+
+def test_localize_warnings():
+    dt.localize_warnings.reset()
+    with dt.localize_warnings.batch():
+        for hour in range(10, 15):
+            dt.datetime(f'2020-01-01 {hour}:00', tz='Australia/Brisbane')
+    assert dt.localize_warnings.counts() == {('converted', 'UTC', 'Australia/Brisbane'): 5}
+
+
+def test_time_period():
+    from pandas import DataFrame, to_datetime
+    df = DataFrame(dict(
+        start_time=to_datetime(['2020-01-02', '2020-01-01'], utc=True),
+        end_time=to_datetime(['2020-01-03', '2020-01-05'], utc=True)
+    ))
+    period = dt.time_period(df, field=['start_time', 'end_time'])
+    assert period.start == dt.datetime('2020-01-01')
+    assert period.end == dt.datetime('2020-01-05')
+    assert dt.time_period('2020-01-01', '2019-01-01').start == dt.datetime('2019-01-01')
+    assert dt.time_period(default='2020-01-01').start == dt.datetime('2020-01-01')
+
+
+def test_time_period_index():
+    from pandas import DataFrame, to_datetime
+    df = DataFrame(dict(
+        start_time=to_datetime(['2020-01-01 08:00', '2020-01-01 10:00', '2020-01-02'], utc=True),
+        end_time=to_datetime(['2020-01-01 12:00', '2020-01-01 11:00', '2020-01-03'], utc=True)
+    ), index=['a', 'b', 'c'])
+    index = dt.TimePeriodIndex.from_frame(df)
+    assert index.at('2020-01-01 10:30') == ['a', 'b']
+    assert index.overlapping('2020-01-01 11:30', '2020-01-02') == ['a', 'c']
+    assert index.within('2020-01-01 09:00', '2020-01-01 12:00') == ['b']
+    assert index.containing('2020-01-01 09:00', '2020-01-01 10:00') == ['a']
+    index.remove('a')
+    index.insert('d', '2020-01-01', '2020-01-05')
+    assert index.at('2020-01-01 10:30') == ['d', 'b']
+
+
+def test_period_array():
+    periods = dt.PeriodArray.make([
+        dt.Period(dt.datetime('2020-01-01'), dt.datetime('2020-01-02')),
+        dt.Period(dt.datetime('2020-01-02 12:00'), dt.datetime('2020-01-03')),
+        dt.Period(dt.datetime('2020-01-05'), dt.datetime('2020-01-06')),
+    ])
+    assert periods.length().total_seconds().tolist() == [86400, 43200, 86400]
+    assert periods.overlaps('2020-01-02 06:00', '2020-01-04').tolist() == [False, True, False]
+    assert periods[0].start == dt.datetime('2020-01-01')
+    assert len(periods.merge_adjacent(dt.duration(hours=12))) == 2
+    assert periods.shift(dt.duration(days=1))[0].start == dt.datetime('2020-01-02')
+
+
+def test_durations_in_words():
+    from pandas import Series, to_timedelta
+    values = Series(to_timedelta([70, 0, 9 * 86400 + 3600], unit='s'))
+    expected = [dt.duration(seconds=int(v.total_seconds())).in_words() for v in values]
+    assert dt.durations_in_words(values).tolist() == expected
+    assert dt.durations_in_words(values, short=True).tolist() == ['1m 10s', '0s', '1w 2d 1h']
+
+
+def test_format_datetimes():
+    times = dt.format_datetimes(['2020-01-01 10:00'], tz='Australia/Brisbane')
+    assert times.tolist() == [dt.datetime('2020-01-01 10:00', tz='Australia/Brisbane').format(dt.NICE_DATETIME_FORMAT)]
+
+
+def test_format_tokens():
+    from pytest import raises
+    time = dt.datetime('2020-01-11 09:05:03.123456', tz='Australia/Brisbane')
+    for fmt in ['Do MMM', 'HH:mm:ss.SSS', 'DDD', 'DDDD', 'dddd D MMMM YYYY [at] h:mm A', 'YYYY-MM-DD HH:mm ZZ', 'Z z']:
+        assert dt.format_datetimes([time], fmt, tz='Australia/Brisbane').tolist() == [time.format(fmt)]
+    with raises(ValueError):
+        dt.strftime_format('Do MMM')
+
+
+def test_range():
+    times = list(dt.range('2020-01-01', '2020-01-03'))
+    assert times == [dt.datetime('2020-01-01'), dt.datetime('2020-01-02'), dt.datetime('2020-01-03')]
+    months = list(dt.range(dt.date('2020-01-31'), dt.date('2020-04-30'), dt.duration(months=1)))
+    assert months == [dt.date('2020-01-31'), dt.date('2020-02-29'), dt.date('2020-03-31'), dt.date('2020-04-30')]
+    array = dt.range('2020-01-01', '2020-01-01 01:00', dt.duration(minutes=15), as_array=True)
+    assert len(array) == 5
+
+
+def test_range_dst():
+    from datetime import date
+    from src.prelude import model
+    days = [date(2020, 4, 4), date(2020, 4, 5), date(2020, 4, 6)]
+    assert list(dt.range(date(2020, 4, 4), date(2020, 4, 6), tz='Australia/Sydney')) == days
+    array = dt.range(date(2020, 4, 4), date(2020, 4, 6), tz='Australia/Sydney', as_array=True)
+    assert [d.date() for d in array] == days
+
+    # Wall clock time is kept across the change of offset
+    start = dt.pn.datetime(2020, 4, 4, 9, tz='Australia/Sydney')
+    end = start.add(days=3)
+    times = list(dt.range(start, end, dt.duration(days=1, hours=1), tz='Australia/Sydney'))
+    assert [t.hour for t in times] == [9, 10, 11]
+    times = dt.range(start, end, tz='Australia/Sydney', as_array=True)
+    assert [t.hour for t in times] == [9, 9, 9, 9]
+    assert not hasattr(model, 'range')
+
+
+def test_timezone_arguments():
+    import datetime
+    from src.prelude import pandas_utils
+    assert dt.get_timezone('Australia/Sydney') is dt.get_timezone('Australia/Sydney')
+    utc = dt.datetime('2020-01-01 00:00', tz=datetime.timezone.utc, warn_on_localize=False)
+    assert utc.offset == 0
+    assert dt.datetime('2020-01-01 00:00', tz=10, warn_on_localize=False).offset == 10 * 3600
+    assert pandas_utils.to_timestamp(utc, tz=10).hour == 10
+
+
+def test_transitions():
+    from pandas import date_range
+    times = date_range('2019-01-01', '2021-01-01', freq='7H', tz='UTC')
+    local = dt.transitions('Australia/Sydney').to_local(times.asi8)
+    assert (local == times.tz_convert('Australia/Sydney').tz_localize(None).asi8).all()
+    assert (dt.transitions('Australia/Sydney').to_utc(local) == times.asi8).all()
+    assert dt.get_timezone('Australia/Sydney') is dt.get_timezone('Australia/Sydney')
@@ -5,4 +5,20 @@ def test_make():
 
 
 def test_sort():
-  assert lst.sort([3,1,2,3,3,2,1]) == [1,1,2,2,3,3,3]
\ No newline at end of file
+  assert lst.sort([3,1,2,3,3,2,1]) == [1,1,2,2,3,3,3]
+
+def test_make_array():
+  assert lst.make_array(1, 2, [3, 4]).tolist() == [1,2,3,4]
+  assert lst.make_array(1, 'a').tolist() == [1, 'a']
+  assert lst.make_array(None, 1).tolist() == [None, 1]
+  assert lst.make_array(1.5, 2).tolist() == [1.5, 2]
+  assert type(lst.make_array(1.5, 2)[1]) is int
+
+
+def test_distinct_array():
+  from pandas import DataFrame
+  a = DataFrame(dict(id=[3,1,2]))
+  b = DataFrame(dict(id=[2,4]))
+  assert lst.distinct_array(a, b, 4, field='id').tolist() == [3,1,2,4]
+  assert lst.distinct_array(a, b, field='id', sort=True).tolist() == [1,2,3,4]
+  assert lst.distinct_array([1, None, 1]).tolist() == [1, None]
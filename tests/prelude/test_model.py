@@ -1,6 +1,6 @@
 from pytest import fixture
 from attrs import define, field
-from src.prelude import model, pth, Model
+from src.prelude import model, pth, storage, Model
 from src.prelude.model import M
 from typing import Generic, Type, List
 from pandas import DataFrame
@@ -62,3 +62,197 @@ class NestedModel(Model):
 
 class TestNestedModel(ModelTest):
     type = SimpleModel
+
+
+@define
+class EventModel(Model):
+    children : List[SimpleModel]
+    at : model.DateTime = field(factory=model.pn.now)
+    frame : DataFrame = field(factory=DataFrame)
+
+
+def test_cached_converters():
+    event = EventModel(children=[SimpleModel(name=str(i), id=i) for i in range(100)])
+    record = event.to_json_dict()
+    assert isinstance(record['at'], float)
+    assert record['children'][1] == dict(name='1', id=1)
+    record.pop('frame')
+    assert model.unstructure_fn(EventModel) is model.unstructure_fn(EventModel)
+    assert model.structure_fn(EventModel) is model.structure_fn(EventModel)
+
+    loaded = EventModel.from_json_dict(record)
+    assert loaded.children == event.children
+    assert loaded.at == event.at
+    assert isinstance(loaded.at, model.DateTime)
+
+    fields = EventModel._get_fields_of_type(DataFrame)
+    assert [f.name for f in fields] == ['frame']
+    assert EventModel._get_fields_of_type(DataFrame) is fields
+
+
+def test_converter_hooks():
+    conv = model.converter.copy()
+    model.unstructure_fn(SimpleModel, conv)
+    conv.register_unstructure_hook(SimpleModel, lambda m: m.name)
+    conv.register_structure_hook(SimpleModel, lambda name, cls: cls(name=name))
+    assert model.unstructure_fn(SimpleModel, conv)(SimpleModel(name='a', id=1)) == 'a'
+    assert model.structure_fn(SimpleModel, conv)('a', SimpleModel) == SimpleModel(name='a')
+
+    event = EventModel(children=[SimpleModel(name='b', id=2)])
+    assert model.unstructure_fn(EventModel, conv)(event)['children'] == ['b']
+
+
+@define
+class FrameModel(Model):
+    name : str = field(default="")
+    frame : DataFrame = field(factory=DataFrame)
+
+
+def test_npy_storage(tmp_path):
+    import numpy as np
+    import pandas as pd
+    frame = DataFrame(
+        dict(
+            a=np.arange(4),
+            b=[0.5, 1.5, None, 2.5],
+            c=list('wxyz'),
+            d=pd.Categorical(list('ssts')),
+            e=pd.date_range('2020', periods=4, tz='Australia/Brisbane'),
+            f=pd.array([1, None, 3, 4], dtype='Int64'),
+        ),
+        index=pd.Index([10, 20, 30, 40], name='key')
+    )
+    original = FrameModel(name='x', frame=frame)
+    path = original.save(tmp_path / 'frames', format='npy')
+    assert (path / 'frame' / storage.SCHEMA).exists()
+
+    loaded = FrameModel.load(path, mmap=True)
+    assert loaded.name == 'x'
+    pd.testing.assert_frame_equal(loaded.frame, frame)
+    assert isinstance(loaded.frame['a'].to_numpy().base, np.memmap)
+
+    # Strings take their own length rather than the longest
+    long = DataFrame(dict(s=['a'] * 999 + ['x' * 1000]))
+    storage.get('npy').save(long, tmp_path / 'long')
+    assert (tmp_path / 'long' / '0.npy').stat().st_size < 4000
+    assert storage.get('npy').load(tmp_path / 'long').equals(long)
+
+    for values in (['a', '', 'ü€'], ['a\0b', ''], ['']):
+        strings = DataFrame(dict(s=values))
+        storage.get('npy').save(strings, tmp_path / 'strings')
+        assert storage.get('npy').load(tmp_path / 'strings', mmap=True)['s'].tolist() == values
+
+    # Switching format replaces the saved copy
+    original.save(path, format='csv')
+    assert not (path / 'frame').exists()
+    assert FrameModel.load(path).frame['a'].tolist() == [0, 1, 2, 3]
+
+
+def test_interrupted_save(tmp_path):
+    import os
+    path = FrameModel(name='x', frame=DataFrame(dict(a=[1, 2]))).save(tmp_path / 'crash', format='npy')
+
+    # A crash after moving the old directory aside
+    os.replace(path / 'frame', path / 'frame.old')
+    assert FrameModel.load(path).frame['a'].tolist() == [1, 2]
+    assert (path / 'frame').exists() and not (path / 'frame.old').exists()
+
+    os.replace(path / 'frame', path / 'frame.old')
+    FrameModel(name='x', frame=DataFrame(dict(a=[3]))).save(path, format='npy')
+    assert FrameModel.load(path).frame['a'].tolist() == [3]
+    assert not (path / 'frame.old').exists()
+
+
+def test_lazy_load(tmp_path):
+    frame = DataFrame(dict(a=[1, 2, 3]))
+    path = FrameModel(name='x', frame=frame).save(tmp_path / 'lazy', format='npy')
+
+    loaded = FrameModel.load(path, lazy=True)
+    assert loaded.name == 'x'
+    assert model._deferred[id(loaded)]['frame'].name == 'frame'
+    assert loaded.frame['a'].tolist() == [1, 2, 3]
+    assert loaded.frame is loaded.frame
+    assert id(loaded) not in model._deferred
+
+    # Assigning a deferred field replaces its handle
+    assigned = FrameModel.load(path, lazy=True)
+    assigned.frame = DataFrame(dict(a=[4]))
+    assigned.materialize()
+    assert id(assigned) not in model._deferred
+    assert assigned.frame['a'].tolist() == [4]
+
+    other = FrameModel.load(path, lazy=True).materialize()
+    assert id(other) not in model._deferred
+    assert other.frame.equals(loaded.frame)
+
+
+@define
+class FramesModel(Model):
+    a : DataFrame = field(factory=DataFrame)
+    b : DataFrame = field(factory=DataFrame)
+    c : DataFrame = field(factory=DataFrame)
+
+
+def test_parallel_save_load(tmp_path, capsys):
+    frames = FramesModel(*[DataFrame(dict(x=range(n))) for n in (3, 2, 1)])
+    path = frames.save(tmp_path / 'frames', workers=3)
+    loaded = FramesModel.load(path, workers=3, processes=True)
+    assert [len(loaded.a), len(loaded.b), len(loaded.c)] == [3, 2, 1]
+
+    # Fields are logged in order whichever finishes first
+    lines = [line.split()[1] for line in capsys.readouterr().out.splitlines() if ' saved to ' in line or ' loaded from ' in line]
+    assert lines == ['a', 'b', 'c', 'record', 'model', 'record', 'a', 'b', 'c', 'model']
+
+
+def test_incremental_save(tmp_path, capsys):
+    frames = FramesModel(*[DataFrame(dict(x=range(n))) for n in (3, 2, 1)])
+    path = frames.save(tmp_path / 'frames', format='npy')
+    manifest = FramesModel._read_manifest(path / storage.MANIFEST)
+    assert list(manifest['fields']) == ['a', 'b', 'c']
+    capsys.readouterr()
+
+    frames.b = DataFrame(dict(x=[5, 6]))
+    frames.save(path, format='npy')
+    out = capsys.readouterr().out
+    assert 'a unchanged' in out and 'c unchanged' in out and 'record unchanged' in out
+    assert 'b saved' in out
+    assert FramesModel.load(path).b['x'].tolist() == [5, 6]
+    assert sorted(p.name for p in path.iterdir()) == ['a', 'b', 'c', 'manifest.json', 'model.json']
+
+    # Unhashable values are always written
+    frames.c = DataFrame(dict(x=[[1], [2]]))
+    frames.save(path, format='csv')
+    frames.save(path, format='csv')
+    assert 'c saved' in capsys.readouterr().out.split('model saved')[1]
+
+
+def test_structural_copy(tmp_path):
+    parent = NestedModel(children=[SimpleModel(name='a'), SimpleModel(name='b')], name='p')
+    copy = parent.copy()
+    assert copy == parent
+    assert copy.children is not parent.children
+    assert copy.children[0] is not parent.children[0]
+    copy.children[0].name = 'z'
+    assert parent.children[0].name == 'a'
+
+    shallow = parent.copy(deep=False)
+    assert shallow.children is parent.children
+
+    frames = FrameModel(name='f', frame=DataFrame(dict(x=[1, 2])))
+    copy = frames.copy()
+    copy.frame.loc[0, 'x'] = 10
+    assert frames.frame['x'].tolist() == [1, 2]
+    assert frames.copy(deep=False).frame is not frames.frame
+
+    # Deferred fields are copied as deferred
+    path = frames.save(tmp_path / 'frames')
+    loaded = FrameModel.load(path, lazy=True)
+    copy = loaded.copy()
+    assert id(copy) in model._deferred
+    assert copy.frame['x'].tolist() == [1, 2]
+    assert copy.frame is not loaded.frame
+
+    # Assigned fields are copied rather than read again
+    loaded = FrameModel.load(path, lazy=True)
+    loaded.frame = DataFrame(dict(x=[7]))
+    assert loaded.copy().frame['x'].tolist() == [7]
@@ -1,8 +1,77 @@
 from src.prelude import *
+from src.prelude import storage
 
 
 def test_pairwise():
     for i,j in seq.pairwise([1,2,3]):
         assert i + 1 == j
 
-    
\ No newline at end of file
+    
+
+def test_register():
+    class Bag:
+        def __init__(self, *items):
+            self.items = items
+
+    @seq.register(Bag)
+    def iter_bag(arg, field, iterkeys):
+        return arg.items
+
+    assert lst.make(1, Bag(2, Bag(3, 4))) == [1,2,3,4]
+    assert seq.dispatch(Bag) is iter_bag
+
+
+def test_deeply_nested():
+    nested = 0
+    for i in range(10_000):
+        nested = [i, nested]
+    assert len(lst.make(nested)) == 10_001
+
+
+def test_max_depth():
+    assert lst.make([1,[2,[3]]], max_depth=2) == [1,2,[3]]
+
+
+def test_cycle():
+    from pytest import raises
+    a = [1,2]
+    a.append(a)
+    with raises(ValueError):
+        lst.make(a)
+
+
+def test_read_csv(tmp_path):
+    from pandas import DataFrame
+    path = tmp_path / 'data.csv'
+    DataFrame(dict(id=[3,1,2,3], name=list('abcd'))).to_csv(path, index=False)
+    source = seq.read(path, chunksize=2)
+    assert lst.make(source, field='id') == [3,1,2,3]
+    assert lst.distinct(source, field='id', method='values') == [3,1,2]
+    assert list(seq.sort(source, field='id', method='values', run_size=2, distinct=True)) == [1,2,3]
+    assert lst.make(source, field='missing') == []
+
+
+def test_read_model_dir(tmp_path):
+    from pandas import DataFrame
+    (tmp_path / 'model.json').write_text('{"trv_id": 10, "name": "x"}')
+    DataFrame(dict(trv_id=[1,2])).to_csv(tmp_path / 'a.csv', index=False)
+    DataFrame(dict(other=[5])).to_csv(tmp_path / 'b.csv', index=False)
+    (tmp_path / 'c.jsonl').write_text('{"trv_id": 3}\n{"trv_id": 4}\n')
+    storage.get('npy').save(DataFrame(dict(trv_id=[6,7])), tmp_path / 'd')
+    assert set.make(seq.read(tmp_path), field='trv_id', method='values') == {1,2,3,4,6,7,10}
+
+
+def test_window():
+    import numpy as np
+    assert list(seq.window([1,2,3,4], 2)) == [(1,2), (2,3), (3,4)]
+    assert list(seq.window(iter(range(7)), 3, step=2)) == [(0,1,2), (2,3,4), (4,5,6)]
+    values = np.arange(5)
+    windows = seq.window(values, 3, step=2)
+    assert windows.tolist() == [[0,1,2], [2,3,4]]
+    assert np.shares_memory(windows, values)
+
+
+def test_chunked():
+    import numpy as np
+    assert list(seq.chunked([1,2,3,4,5], 2)) == [[1,2], [3,4], [5]]
+    assert [c.tolist() for c in seq.chunked(np.arange(5), 3)] == [[0,1,2], [3,4]]
@@ -15,4 +15,66 @@ def test_venn():
   left,mid,right = set.venn(['a','b','c'],['c','d','a'])
   assert left == {'b'}
   assert mid == {'a','c'}
-  assert right == {'d'}  
\ No newline at end of file
+  assert right == {'d'}  
+
+def test_venn_counts():
+  assert set.venn([1,2,3],[3,4], counts_only=True) == (2, 1, 1)
+
+
+def test_regions():
+  regions = set.venn([1,2], [2,3], [3,4])
+  assert regions[(True, False, False)] == {1}
+  assert regions[(True, True, False)] == {2}
+  assert regions[(False, True, True)] == {3}
+  assert regions[(False, False, True)] == {4}
+  assert (True, True, True) not in regions
+  assert len(regions) == 4
+
+
+def test_regions_many():
+  from pytest import raises
+  regions = set.regions(*[[i, i + 1] for i in range(20)])
+  assert len(regions) == 21
+  assert set.regions(*[[1]] * 20, counts_only=True) == {(True,) * 20: 1}
+  with raises(ValueError):
+    set.regions(*[[i] for i in range(64)])
+
+
+def test_regions_keep_values():
+  import warnings
+  with warnings.catch_warnings():
+    warnings.simplefilter('error')
+    assert set.venn(['a', None], ['a']) == ({None}, {'a'}, set.empty())
+    left, middle, right = set.venn([1, 2], [1.5])
+  assert left == {1, 2} and all(type(value) is int for value in left)
+  assert middle == set.empty() and right == {1.5}
+
+
+def test_sorted_set():
+  s = set.sort([5, 1, 3, 3], 9)
+  assert list(s) == [1, 3, 5, 9]
+  assert s.rank(5) == 2
+  assert list(s.irange(2, 5)) == [3, 5]
+  s.add(4)
+  s.discard(1)
+  assert list(s) == [3, 4, 5, 9]
+  assert list(s & set.SortedSet([4, 9, 10])) == [4, 9]
+
+
+def test_sorted_set_methods():
+  s = set.SortedSet([3, 1])
+  assert list(s.union([5], [6, 2])) == [1, 2, 3, 5, 6]
+  assert list(s.intersection([1, 3, 4], [3])) == [3]
+  assert list(s.difference([1], [4])) == [3]
+  assert list(s.union()) == [1, 3] and s.union() is not s
+  s.update([7, 0], {2})
+  assert list(s) == [0, 1, 2, 3, 7]
+  assert s.rank(3) == 3 and s[-1] == 7
+  s.difference_update([0], [7])
+  assert list(s) == [1, 2, 3]
+  s.intersection_update([2, 3, 4])
+  assert list(s) == [2, 3]
+  s.symmetric_difference_update([3, 4])
+  assert list(s) == [2, 4]
+  assert s.issubset([1, 2, 4]) and not s.issubset([2])
+  assert s.issuperset([4]) and not s.issuperset([4, 5])
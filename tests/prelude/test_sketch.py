@@ -0,0 +1,34 @@
+from src.prelude import *
+from pandas import DataFrame
+import numpy as np
+
+
+def test_hyperloglog():
+  df = DataFrame(dict(id=np.arange(10_000) % 5_000))
+  count = sketch.hyperloglog(df, field='id', method='values').count()
+  assert abs(count - 5_000) < 250
+
+
+def test_hyperloglog_merge():
+  a = sketch.hyperloglog(np.arange(0, 6_000))
+  b = sketch.hyperloglog(np.arange(4_000, 10_000))
+  assert abs((a | b).count() - 10_000) < 500
+
+
+def test_bloom():
+  bloom = sketch.bloom(1, 2, [3, 'a'], capacity=100)
+  assert 1 in bloom
+  assert 'a' in bloom
+  assert bloom.contains([1, 2, 3]).all()
+  assert 'b' not in bloom.merge(sketch.bloom(4, capacity=100))
+
+
+def test_hash_widths():
+  small = np.array([-1, 5, 7], dtype=np.int32)
+  assert -1 in sketch.bloom(small, capacity=100)
+  assert sketch.bloom([-1, 5], capacity=100).contains(small[:2]).all()
+  assert 1.5 in sketch.bloom(np.array([1.5], dtype=np.float32), capacity=100)
+
+  values = np.arange(1_000)
+  count = sketch.hyperloglog(values, values.astype(np.int16), values.astype(np.uint32)).count()
+  assert abs(count - 1_000) < 50